@@ -0,0 +1,68 @@
+"""Benchmark inbound parse/map throughput for different worker counts
+
+Usage: python -m benchmarks.inbound_scaling [n_files] [max_workers]
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+from src.client.ingest import ParallelInboundIngestor, parse_and_map_files
+from src.client.repository import ClientRepository
+
+
+def create_files(inbound_dir: str, n_files: int):
+    for i in range(1, n_files + 1):
+        workorder = {
+            "orderNo": i,
+            "isCanceled": False,
+            "isDeleted": False,
+            "isDone": False,
+            "isOnHold": False,
+            "isPending": True,
+            "summary": f"Benchmark workorder #{i}",
+            "description": "x" * 200,
+            "creationDate": "2025-05-01T22:36:24.105812+00:00",
+            "lastUpdateDate": "2025-05-01T23:36:24.105812+00:00",
+        }
+        with open(os.path.join(inbound_dir, f"workorder_{i}.json"), "w") as f:
+            json.dump(workorder, f)
+
+
+async def run_parallel(client_repo: ClientRepository, workers: int) -> int:
+    ingestor = ParallelInboundIngestor(client_repo, workers)
+    try:
+        count = 0
+        async for batch in ingestor.iter_mapped_batches():
+            count += len(batch)
+        return count
+    finally:
+        ingestor.shutdown()
+
+
+def main():
+    n_files = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 1
+
+    with tempfile.TemporaryDirectory() as inbound_dir:
+        create_files(inbound_dir, n_files)
+        client_repo = ClientRepository(inbound_dir=inbound_dir, outbound_dir=inbound_dir)
+
+        start = time.perf_counter()
+        count = len(parse_and_map_files(inbound_dir, client_repo.list_inbound_files()))
+        baseline = time.perf_counter() - start
+        print(f"workers=1 (in-process) files={count} elapsed={baseline:.3f}s rate={count / baseline:.0f}/s")
+
+        workers = 2
+        while workers <= max_workers:
+            start = time.perf_counter()
+            count = asyncio.run(run_parallel(client_repo, workers))
+            elapsed = time.perf_counter() - start
+            print(f"workers={workers} files={count} elapsed={elapsed:.3f}s rate={count / elapsed:.0f}/s speedup={baseline / elapsed:.2f}x")
+            workers *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Benchmark the inbound/outbound pipeline against a local TracOS store
+
+Usage: python -m benchmarks.pipeline [n_workorders] [backend] [latency_ms]
+    backend is "memory" (default) or "sqlite"; latency_ms delays every store round-trip
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from loguru import logger
+
+from benchmarks.inbound_scaling import create_files
+from src.client.repository import ClientRepository
+from src.main import IntegrationService
+from src.tracos.factory import create_tracos_repository
+
+
+async def run(n_workorders: int, backend: str, latency_ms: float):
+    with tempfile.TemporaryDirectory() as base_dir:
+        inbound_dir, outbound_dir = os.path.join(base_dir, "inbound"), os.path.join(base_dir, "outbound")
+        os.makedirs(inbound_dir)
+        os.makedirs(outbound_dir)
+        create_files(inbound_dir, n_workorders)
+
+        store = create_tracos_repository(backend, latency_ms, sqlite_path=os.path.join(base_dir, "tracos.sqlite3"))
+        service = IntegrationService(
+            tracos_repo=store,
+            client_repo=ClientRepository(inbound_dir, outbound_dir),
+            outbound_sync_mode="flag",
+            outbound_batch_size=n_workorders,
+        )
+        await store.connect()
+        try:
+            start = time.perf_counter()
+            written, _ = await service.process_inbound()
+            inbound_elapsed = time.perf_counter() - start
+
+            start = time.perf_counter()
+            exported, _ = await service.process_outbound()
+            outbound_elapsed = time.perf_counter() - start
+        finally:
+            await store.disconnect()
+
+    print(f"backend={backend} latency={latency_ms}ms")
+    print(f"inbound:  {written} workorders in {inbound_elapsed:.3f}s ({written / inbound_elapsed:.0f}/s)")
+    print(f"outbound: {exported} workorders in {outbound_elapsed:.3f}s ({exported / max(outbound_elapsed, 1e-9):.0f}/s)")
+
+
+def main():
+    logger.remove()
+    n_workorders = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    backend = sys.argv[2] if len(sys.argv) > 2 else "memory"
+    latency_ms = float(sys.argv[3]) if len(sys.argv) > 3 else 0
+    asyncio.run(run(n_workorders, backend, latency_ms))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Benchmark cold start: import time and time-to-first-record
+
+Usage: python -m benchmarks.startup [runs]
+    Each run spawns a fresh interpreter, so numbers include interpreter start-up.
+    Time-to-first-record runs the service once against a throwaway SQLite store with a single inbound file.
+"""
+import os
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.inbound_scaling import create_files
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def time_command(args: list, env: dict) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, *args], cwd=PROJECT_ROOT, env=env, check=True, capture_output=True)
+    return time.perf_counter() - start
+
+
+def time_to_first_record(base_dir: str) -> float:
+    inbound_dir, outbound_dir = os.path.join(base_dir, "inbound"), os.path.join(base_dir, "outbound")
+    for directory in (inbound_dir, outbound_dir):
+        os.makedirs(directory, exist_ok=True)
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+    create_files(inbound_dir, 1)
+
+    sqlite_path = os.path.join(base_dir, "tracos.sqlite3")
+    if os.path.exists(sqlite_path):
+        os.remove(sqlite_path)
+    # Kept under base_dir so runs never touch the project's own ./data/checkpoints
+    checkpoint_dir = os.path.join(base_dir, "checkpoints")
+    shutil.rmtree(checkpoint_dir, ignore_errors=True)
+
+    env = dict(
+        os.environ,
+        RUN_MODE="once",
+        TRACOS_BACKEND="sqlite",
+        SQLITE_PATH=sqlite_path,
+        DATA_INBOUND_DIR=inbound_dir,
+        DATA_OUTBOUND_DIR=outbound_dir,
+        CHECKPOINT_DIR=checkpoint_dir,
+    )
+    elapsed = time_command(["-m", "src.main"], env)
+    with sqlite3.connect(sqlite_path) as conn:
+        (count,) = conn.execute("SELECT COUNT(*) FROM workorders").fetchone()
+    if count != 1:
+        raise RuntimeError(f"Expected the inbound record to be persisted, found {count}")
+    return elapsed
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    baseline = [time_command(["-c", "pass"], dict(os.environ)) for _ in range(runs)]
+    imports = [time_command(["-c", "import src.main"], dict(os.environ)) for _ in range(runs)]
+    with tempfile.TemporaryDirectory() as base_dir:
+        first_record = [time_to_first_record(base_dir) for _ in range(runs)]
+
+    print(f"interpreter:          {statistics.median(baseline) * 1000:.0f}ms (median of {runs})")
+    print(f"import src.main:      {statistics.median(imports) * 1000:.0f}ms")
+    print(f"time-to-first-record: {statistics.median(first_record) * 1000:.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
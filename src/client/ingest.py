@@ -0,0 +1,117 @@
+"""Process-pool ingestion of inbound workorder files"""
+import asyncio
+import itertools
+import zlib
+from concurrent.futures import Executor
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from src.client.repository import ClientRepository
+from src.config import INBOUND_CHUNK_SIZE
+from src.translation.mapper import WorkorderMapper
+
+
+def shard_files(file_names: List[str], shards: int, chunk_size: int = INBOUND_CHUNK_SIZE) -> List[List[str]]:
+    """Partition file names by a stable hash of the name, split into chunks of at most chunk_size"""
+    buckets: List[List[str]] = [[] for _ in range(max(shards, 1))]
+    for file_name in file_names:
+        buckets[zlib.crc32(file_name.encode()) % len(buckets)].append(file_name)
+
+    chunks = []
+    for bucket in buckets:
+        for start in range(0, len(bucket), chunk_size):
+            chunks.append(bucket[start:start + chunk_size])
+    return chunks
+
+
+def map_inbound_files(client_repo: ClientRepository, file_names: List[str], mapper: WorkorderMapper = WorkorderMapper) -> Tuple[List[Tuple[str, Dict[str, Any]]], List[str]]:
+    """Read, validate and map inbound files to TracOS format, keeping the file each workorder came from.
+
+    Returns (mapped pairs, names of the files processed): files with invalid content count as
+    processed, files that could not be read do not, so they are tried again.
+    """
+    mapped, processed = [], []
+    for file_name in file_names:
+        try:
+            workorder = client_repo.read_inbound_file(file_name, raise_io_errors=True)
+        except IOError:
+            continue
+        processed.append(file_name)
+        if workorder is None:
+            continue
+        try:
+            mapped.append((file_name, mapper.client_to_tracos(workorder)))
+        except Exception as e:
+            logger.error(f"Error mapping inbound workorder from {file_name}: {e}")
+    return mapped, processed
+
+
+def parse_and_map_files(inbound_dir: str, file_names: List[str], with_file_names: bool = False, mapper: WorkorderMapper = WorkorderMapper) -> Any:
+    """Worker entrypoint: map a chunk of inbound files.
+
+    Returns the mapped workorders, or with with_file_names the (mapped pairs, processed file
+    names) of map_inbound_files.
+    """
+    client_repo = ClientRepository(inbound_dir=inbound_dir, outbound_dir=inbound_dir)
+    mapped, processed = map_inbound_files(client_repo, file_names, mapper)
+    return (mapped, processed) if with_file_names else [workorder for _, workorder in mapped]
+
+
+class ParallelInboundIngestor:
+    """Spreads CPU-bound parsing and mapping of inbound files across worker processes"""
+
+    def __init__(self, client_repo: ClientRepository, workers: int, chunk_size: int = INBOUND_CHUNK_SIZE, executor: Optional[Executor] = None, mapper: WorkorderMapper = WorkorderMapper):
+        self.client_repo = client_repo
+        self.workers = workers
+        self.chunk_size = chunk_size
+        # Sent to the workers with each chunk, so it must be picklable
+        self.mapper = mapper
+        self._executor = executor
+        self._owns_executor = executor is None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            # Imported here so serial ingestion (which uses map_inbound_files) never loads the pool
+            from concurrent.futures import ProcessPoolExecutor
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    async def iter_mapped_batches(self, file_names: Optional[List[str]] = None, with_file_names: bool = False) -> AsyncIterator[List[Any]]:
+        """Yield mapped TracOS workorders chunk by chunk, as soon as each worker finishes one.
+
+        A chunk whose worker fails is logged and skipped: none of its files is reported as
+        processed (with_file_names), so none of them is checkpointed.
+        Only two chunks per worker are in flight at a time, and the next ones are dispatched as
+        the consumer takes results, so a slow consumer does not pile up the whole drop in memory.
+        """
+        if file_names is None:
+            file_names = self.client_repo.list_inbound_files()
+        chunks = shard_files(file_names, self.workers, self.chunk_size)
+        logger.info(f"Dispatching {len(file_names)} inbound files in {len(chunks)} chunks to {self.workers} workers")
+
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        remaining = iter(chunks)
+        in_flight = set()
+        try:
+            while True:
+                for chunk in itertools.islice(remaining, self.workers * 2 - len(in_flight)):
+                    in_flight.add(loop.run_in_executor(executor, parse_and_map_files, self.client_repo.inbound_dir, chunk, with_file_names, self.mapper))
+                if not in_flight:
+                    return
+                done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        yield future.result()
+                    except Exception as e:
+                        logger.error(f"Inbound worker failed: {e}")
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+    def shutdown(self):
+        """Stop the worker processes if this ingestor created them"""
+        if self._executor is not None and self._owns_executor:
+            self._executor.shutdown(wait=True)
+            self._executor = None
@@ -1,42 +1,63 @@
 import os
+import gzip
+import hashlib
 import json
-from typing import Dict, List, Any
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Optional
 from loguru import logger
 
-from src.config import DATA_INBOUND_DIR, DATA_OUTBOUND_DIR
+from src.config import DATA_INBOUND_DIR, DATA_OUTBOUND_DIR, OUTBOUND_LAYOUT
+
+# Directory under the outbound dir holding compacted archives (see src/client/retention.py)
+ARCHIVE_DIR_NAME = "archive"
 
 class ClientRepository:
     """Repository for interacting with the client's file system"""
 
-    def __init__(self, inbound_dir: str = DATA_INBOUND_DIR, outbound_dir: str = DATA_OUTBOUND_DIR):
+    def __init__(self, inbound_dir: str = DATA_INBOUND_DIR, outbound_dir: str = DATA_OUTBOUND_DIR, outbound_layout: str = OUTBOUND_LAYOUT):
         self.inbound_dir = inbound_dir
         self.outbound_dir = outbound_dir
+        self.outbound_layout = outbound_layout
 
-    async def get_inbound_workorders(self) -> List[Dict[str, Any]]:
-        """Read all inbound workorder files"""
+    async def get_inbound_workorders(self, file_names: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Read all inbound workorder files, or only the given ones"""
         workorders = []
 
         try:
-            files = [f for f in os.listdir(self.inbound_dir) if f.endswith(".json")]
-
-            for file_name in files:
-                file_path = os.path.join(self.inbound_dir, file_name)
-                try:
-                    with open(file_path, "r") as f:
-                        workorder = json.load(f)
-                        if self._validate_inbound_workorder(workorder):
-                            workorders.append(workorder)
-                        else:
-                            logger.warning(f"Invalid workorder format in {file_name}")
-                except (json.JSONDecodeError, UnicodeDecodeError) as e:
-                    logger.error(f"Error parsing JSON from {file_name}: {e}")
-                except IOError as e:
-                    logger.error(f"IO error reading {file_name}: {e}")
+            for file_name in file_names if file_names is not None else self.list_inbound_files():
+                workorder = self.read_inbound_file(file_name)
+                if workorder is not None:
+                    workorders.append(workorder)
         except Exception as e:
             logger.error(f"Error reading inbound directory: {e}")
 
         return workorders
 
+    def list_inbound_files(self) -> List[str]:
+        """List inbound workorder file names in a stable order"""
+        return sorted(f for f in os.listdir(self.inbound_dir) if f.endswith(".json"))
+
+    def read_inbound_file(self, file_name: str, raise_io_errors: bool = False) -> Optional[Dict[str, Any]]:
+        """Read and validate a single inbound workorder file, returning None if unusable.
+
+        With raise_io_errors, a file that could not be read raises IOError instead, so callers
+        can retry it later rather than treat it like a file with invalid content.
+        """
+        file_path = os.path.join(self.inbound_dir, file_name)
+        try:
+            with open(file_path, "r") as f:
+                workorder = json.load(f)
+                if self._validate_inbound_workorder(workorder):
+                    return workorder
+                logger.warning(f"Invalid workorder format in {file_name}")
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            logger.error(f"Error parsing JSON from {file_name}: {e}")
+        except IOError as e:
+            logger.error(f"IO error reading {file_name}: {e}")
+            if raise_io_errors:
+                raise
+        return None
+
     def _validate_inbound_workorder(self, workorder: Dict[str, Any]) -> bool:
         """Validate that the inbound workorder has required fields and valid orderNo"""
         required_fields = ["orderNo", "isCanceled", "isDeleted", "creationDate"]
@@ -55,7 +76,9 @@ class ClientRepository:
                 logger.error("Cannot write workorder without orderNo")
                 return False
 
-            file_path = os.path.join(self.outbound_dir, f"{workorder['orderNo']}.json")
+            file_path = self.outbound_path(workorder["orderNo"])
+            if self.outbound_layout != "flat":
+                os.makedirs(os.path.dirname(file_path), exist_ok=True)
 
             with open(file_path, "w") as f:
                 json.dump(workorder, f, default=str)
@@ -68,3 +91,58 @@ class ClientRepository:
         except Exception as e:
             logger.error(f"Error writing outbound workorder: {e}")
             return False
+
+    def outbound_path(self, order_no: int, written_at: datetime = None) -> str:
+        """Path of the outbound file for order_no under the configured layout"""
+        file_name = f"{order_no}.json"
+        if self.outbound_layout == "hashed":
+            digest = hashlib.sha1(str(order_no).encode()).hexdigest()
+            return os.path.join(self.outbound_dir, digest[:2], digest[2:4], file_name)
+        if self.outbound_layout == "date":
+            written_at = written_at or datetime.now(timezone.utc)
+            return os.path.join(self.outbound_dir, written_at.strftime("%Y"), written_at.strftime("%m"), written_at.strftime("%d"), file_name)
+        return os.path.join(self.outbound_dir, file_name)
+
+    def get_latest_outbound_workorder(self, order_no: int) -> Optional[Dict[str, Any]]:
+        """Return the most recently written outbound workorder for order_no, live or archived"""
+        file_path = self._find_latest_outbound_file(order_no)
+        if file_path:
+            with open(file_path, "r") as f:
+                return json.load(f)
+        return self._find_in_archives(order_no)
+
+    def _find_latest_outbound_file(self, order_no: int) -> Optional[str]:
+        if self.outbound_layout != "date":
+            file_path = self.outbound_path(order_no)
+            return file_path if os.path.exists(file_path) else None
+
+        # Newest day first: YYYY/MM/DD directory names sort chronologically
+        for year in self._sorted_subdirs(self.outbound_dir):
+            for month in self._sorted_subdirs(year):
+                for day in self._sorted_subdirs(month):
+                    file_path = os.path.join(day, f"{order_no}.json")
+                    if os.path.exists(file_path):
+                        return file_path
+        return None
+
+    def _find_in_archives(self, order_no: int) -> Optional[Dict[str, Any]]:
+        archive_dir = os.path.join(self.outbound_dir, ARCHIVE_DIR_NAME)
+        if not os.path.isdir(archive_dir):
+            return None
+
+        # Archives are named by day; within one, entries are appended oldest first
+        for archive_name in sorted(os.listdir(archive_dir), reverse=True):
+            latest = None
+            with gzip.open(os.path.join(archive_dir, archive_name), "rt") as f:
+                for line in f:
+                    entry = json.loads(line)
+                    if entry["workorder"].get("orderNo") == order_no:
+                        latest = entry["workorder"]
+            if latest is not None:
+                return latest
+        return None
+
+    @staticmethod
+    def _sorted_subdirs(path: str) -> List[str]:
+        names = [name for name in os.listdir(path) if name.isdigit() and os.path.isdir(os.path.join(path, name))]
+        return [os.path.join(path, name) for name in sorted(names, reverse=True)]
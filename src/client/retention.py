@@ -0,0 +1,111 @@
+"""Compact old outbound files into per-day gzip archives
+
+Usage: python -m src.client.retention [--days N]
+"""
+import argparse
+import gzip
+import json
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from loguru import logger
+
+from src.client.repository import ARCHIVE_DIR_NAME
+from src.config import DATA_OUTBOUND_DIR, OUTBOUND_RETENTION_DAYS
+
+# A file being archived is renamed to this suffix first, so a rewrite of its path lands in a new file
+COMPACTING_SUFFIX = ".compacting"
+
+
+def compact_outbound(outbound_dir: str, older_than_days: int, now: datetime = None) -> int:
+    """Move outbound files last written more than older_than_days ago into archives.
+
+    Files are grouped by the UTC day they were written and appended, oldest first, to
+    archive/YYYY-MM-DD.jsonl.gz. Directories emptied by the compaction are removed.
+    Each file is renamed aside before it is read, and left in place if it was rewritten
+    after the scan. Returns the number of files archived.
+    """
+    now = now or datetime.now(timezone.utc)
+    cutoff = (now - timedelta(days=older_than_days)).timestamp()
+    archive_dir = os.path.join(outbound_dir, ARCHIVE_DIR_NAME)
+
+    by_day = defaultdict(list)
+    for root, dirs, files in os.walk(outbound_dir):
+        if root == outbound_dir and ARCHIVE_DIR_NAME in dirs:
+            dirs.remove(ARCHIVE_DIR_NAME)
+        for file_name in files:
+            if file_name.endswith(".json" + COMPACTING_SUFFIX):
+                # Left behind by an interrupted compaction
+                _restore(os.path.join(root, file_name))
+                continue
+            if not file_name.endswith(".json"):
+                continue
+            file_path = os.path.join(root, file_name)
+            mtime = os.path.getmtime(file_path)
+            if mtime < cutoff:
+                day = datetime.fromtimestamp(mtime, timezone.utc).strftime("%Y-%m-%d")
+                by_day[day].append((mtime, file_path))
+
+    archived = 0
+    for day, entries in sorted(by_day.items()):
+        os.makedirs(archive_dir, exist_ok=True)
+        # Appending adds a new gzip member; gzip readers treat the members as one stream
+        with gzip.open(os.path.join(archive_dir, f"{day}.jsonl.gz"), "at") as archive:
+            for mtime, file_path in sorted(entries):
+                aside = file_path + COMPACTING_SUFFIX
+                try:
+                    os.rename(file_path, aside)
+                    with open(aside, "r") as f:
+                        workorder = json.load(f)
+                    rewritten = os.path.getmtime(aside) != mtime
+                except (IOError, json.JSONDecodeError) as e:
+                    logger.error(f"Skipping unreadable outbound file {file_path}: {e}")
+                    _restore(aside)
+                    continue
+                if rewritten:
+                    # Written again since the scan: it is no longer old enough to archive
+                    _restore(aside)
+                    continue
+                entry = {
+                    "file": os.path.relpath(file_path, outbound_dir),
+                    "writtenAt": datetime.fromtimestamp(mtime, timezone.utc).isoformat(),
+                    "workorder": workorder,
+                }
+                archive.write(json.dumps(entry) + "\n")
+                os.remove(aside)
+                archived += 1
+
+    _remove_empty_dirs(outbound_dir)
+    logger.info(f"Archived {archived} outbound files older than {older_than_days} days")
+    return archived
+
+
+def _restore(aside: str):
+    """Put a file renamed aside back, unless a newer file was written to its path meanwhile"""
+    file_path = aside[:-len(COMPACTING_SUFFIX)]
+    try:
+        if os.path.exists(file_path):
+            os.remove(aside)
+        else:
+            os.rename(aside, file_path)
+    except FileNotFoundError:
+        pass
+
+
+def _remove_empty_dirs(outbound_dir: str):
+    for root, dirs, files in os.walk(outbound_dir, topdown=False):
+        if root != outbound_dir and not os.listdir(root):
+            os.rmdir(root)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact old outbound workorder files into archives")
+    parser.add_argument("--days", type=int, default=OUTBOUND_RETENTION_DAYS, help="archive files older than this many days")
+    parser.add_argument("--outbound-dir", default=DATA_OUTBOUND_DIR)
+    args = parser.parse_args()
+    compact_outbound(args.outbound_dir, args.days)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,82 @@
 import os
+import socket
+from dotenv import load_dotenv
 from loguru import logger
 
+# Resolve .env once, before any setting below is read
+load_dotenv()
+
 # MongoDB configuration
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/tractian")
 MONGO_DATABASE = os.getenv("MONGO_DATABASE", "tractian")
 MONGO_COLLECTION = os.getenv("MONGO_COLLECTION", "workorders")
+MONGO_STATE_COLLECTION = os.getenv("MONGO_STATE_COLLECTION", "sync_state")
+
+# TracOS storage backend: "mongo", or "memory"/"sqlite" to run and benchmark without MongoDB.
+# TRACOS_LATENCY_MS > 0 delays every store round-trip to study the impact of DB latency.
+TRACOS_BACKEND = os.getenv("TRACOS_BACKEND", "mongo")
+SQLITE_PATH = os.getenv("SQLITE_PATH", "./data/tracos.sqlite3")
+TRACOS_LATENCY_MS = float(os.getenv("TRACOS_LATENCY_MS", "0"))
 
 # File system directories
 DATA_INBOUND_DIR = os.getenv("DATA_INBOUND_DIR", "./data/inbound")
 DATA_OUTBOUND_DIR = os.getenv("DATA_OUTBOUND_DIR", "./data/outbound")
 
-# Ensure directories exist
-for directory in [DATA_INBOUND_DIR, DATA_OUTBOUND_DIR]:
-    if not os.path.exists(directory):
-        os.makedirs(directory)
-        logger.info(f"Created directory: {directory}")
+# Outbound layout: "flat" ({orderNo}.json), "hashed" (two levels of hash prefixes) or
+# "date" (YYYY/MM/DD per write); files older than the retention are rolled into archives
+OUTBOUND_LAYOUT = os.getenv("OUTBOUND_LAYOUT", "flat")
+OUTBOUND_RETENTION_DAYS = int(os.getenv("OUTBOUND_RETENTION_DAYS", "30"))
+
+# "once" runs a single inbound + outbound cycle, "continuous" keeps syncing until stopped
+RUN_MODE = os.getenv("RUN_MODE", "once")
+
+# Scheduling: inbound and outbound run as independent loops, each with its own interval,
+# batch size (0 = every inbound file per cycle) and number of workorders handled concurrently
+SYNC_INTERVAL_SECONDS = int(os.getenv("SYNC_INTERVAL_SECONDS", "60"))
+INBOUND_INTERVAL_SECONDS = int(os.getenv("INBOUND_INTERVAL_SECONDS", SYNC_INTERVAL_SECONDS))
+OUTBOUND_INTERVAL_SECONDS = int(os.getenv("OUTBOUND_INTERVAL_SECONDS", SYNC_INTERVAL_SECONDS))
+INBOUND_BATCH_SIZE = int(os.getenv("INBOUND_BATCH_SIZE", "0"))
+INBOUND_CONCURRENCY = int(os.getenv("INBOUND_CONCURRENCY", "1"))
+OUTBOUND_CONCURRENCY = int(os.getenv("OUTBOUND_CONCURRENCY", "1"))
+# Adaptive scheduling: idle cycles stretch the interval up to IDLE_BACKOFF_MAX_SECONDS, cycles
+# that leave a backlog run again at once, and each cycle stops after CYCLE_TIME_BUDGET_SECONDS
+IDLE_BACKOFF_MAX_SECONDS = float(os.getenv("IDLE_BACKOFF_MAX_SECONDS", "300"))
+IDLE_BACKOFF_FACTOR = float(os.getenv("IDLE_BACKOFF_FACTOR", "2"))
+CYCLE_TIME_BUDGET_SECONDS = float(os.getenv("CYCLE_TIME_BUDGET_SECONDS", "0"))
+
+# Inbound ingestion: worker processes used to parse and map inbound files (1 = in-process)
+INBOUND_WORKERS = int(os.getenv("INBOUND_WORKERS", "1"))
+INBOUND_CHUNK_SIZE = int(os.getenv("INBOUND_CHUNK_SIZE", "500"))
+# Inbound writes: "delta" reads the stored workorder and $sets the changed fields,
+# "conditional" upserts in one round-trip and lets MongoDB reject stale versions
+INBOUND_WRITE_MODE = os.getenv("INBOUND_WRITE_MODE", "delta")
+
+# Outbound selection: "flag" reads every unsynced workorder, "lease" claims batches so
+# several service instances can drain the outbound queue without exporting twice, and
+# "watermark" exports whatever changed after the persisted (updatedAt, _id) high-water mark
+OUTBOUND_SYNC_MODE = os.getenv("OUTBOUND_SYNC_MODE", "flag")
+# In watermark mode the per-workorder isSynced write is optional
+OUTBOUND_MARK_SYNCED = os.getenv("OUTBOUND_MARK_SYNCED", "true").lower() == "true"
+# Watermark mode only reads workorders last updated more than this long ago: updatedAt is
+# stamped before the write commits, so a newer change can still appear behind the watermark
+OUTBOUND_WATERMARK_LAG_SECONDS = float(os.getenv("OUTBOUND_WATERMARK_LAG_SECONDS", "5"))
+OUTBOUND_BATCH_SIZE = int(os.getenv("OUTBOUND_BATCH_SIZE", "100"))
+OUTBOUND_LEASE_SECONDS = int(os.getenv("OUTBOUND_LEASE_SECONDS", "300"))
+INSTANCE_ID = os.getenv("INSTANCE_ID") or f"{socket.gethostname()}-{os.getpid()}"
+
+# Resumable runs: progress is checkpointed under CHECKPOINT_DIR (empty disables it), and on
+# SIGINT/SIGTERM in-flight work gets up to SHUTDOWN_DRAIN_SECONDS to finish before it is cancelled
+CHECKPOINT_DIR = os.getenv("CHECKPOINT_DIR", "./data/checkpoints")
+SHUTDOWN_DRAIN_SECONDS = float(os.getenv("SHUTDOWN_DRAIN_SECONDS", "30"))
+
+# Multi-tenant mode: a JSON list of tenants (name, inbound_dir, outbound_dir, database, collection)
+# served by one process; TENANT_CONCURRENCY caps how many tenant cycles run at the same time
+TENANTS_FILE = os.getenv("TENANTS_FILE", "")
+TENANT_CONCURRENCY = int(os.getenv("TENANT_CONCURRENCY", "4"))
+
+def ensure_data_dirs(*directories: str):
+    """Create the inbound/outbound directories if missing (called at startup, not on import)"""
+    for directory in directories or (DATA_INBOUND_DIR, DATA_OUTBOUND_DIR):
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+            logger.info(f"Created directory: {directory}")
@@ -2,11 +2,50 @@
 import asyncio
 import os
 import signal
+from concurrent.futures import Executor
+from datetime import datetime, timedelta, timezone
 from loguru import logger
-from dotenv import load_dotenv
 
+from src.config import (
+    CHECKPOINT_DIR,
+    CYCLE_TIME_BUDGET_SECONDS,
+    DATA_INBOUND_DIR,
+    DATA_OUTBOUND_DIR,
+    IDLE_BACKOFF_FACTOR,
+    IDLE_BACKOFF_MAX_SECONDS,
+    INBOUND_BATCH_SIZE,
+    INBOUND_CHUNK_SIZE,
+    INBOUND_CONCURRENCY,
+    INBOUND_INTERVAL_SECONDS,
+    INBOUND_WORKERS,
+    INSTANCE_ID,
+    MONGO_URI,
+    OUTBOUND_BATCH_SIZE,
+    OUTBOUND_CONCURRENCY,
+    OUTBOUND_INTERVAL_SECONDS,
+    OUTBOUND_LEASE_SECONDS,
+    OUTBOUND_MARK_SYNCED,
+    OUTBOUND_SYNC_MODE,
+    OUTBOUND_WATERMARK_LAG_SECONDS,
+    RUN_MODE,
+    SHUTDOWN_DRAIN_SECONDS,
+    TENANTS_FILE,
+    TRACOS_BACKEND,
+    ensure_data_dirs,
+)
 from src.utils.logging import setup_logging
-from src.tracos.repository import TracOSRepository
+from src.utils.checkpoint import SyncCheckpoint
+from src.utils.metrics import SyncMetrics
+from src.utils.scheduling import AdaptiveSchedule, TimeBudget
+from src.tracos.base import (
+    SAVE_CREATED,
+    SAVE_FAILED,
+    SAVE_STALE,
+    SAVE_UNCHANGED,
+    SAVE_UPDATED,
+    TracOSStore,
+)
+from src.tracos.factory import create_tracos_repository
 from src.client.repository import ClientRepository
 from src.translation.mapper import WorkorderMapper
 
@@ -16,87 +55,579 @@ shutdown_event = asyncio.Event()
 class IntegrationService:
     """Main service that orchestrates the integration flow"""
 
-    def __init__(self, tracos_repo: TracOSRepository = None, client_repo: ClientRepository = None, mapper: WorkorderMapper = None):
-        self.tracos_repo = tracos_repo or TracOSRepository()
+    def __init__(
+        self,
+        tracos_repo: TracOSStore = None,
+        client_repo: ClientRepository = None,
+        mapper: WorkorderMapper = None,
+        inbound_workers: int = INBOUND_WORKERS,
+        outbound_sync_mode: str = OUTBOUND_SYNC_MODE,
+        instance_id: str = INSTANCE_ID,
+        mark_synced: bool = OUTBOUND_MARK_SYNCED,
+        watermark_lag: float = OUTBOUND_WATERMARK_LAG_SECONDS,
+        inbound_interval: float = INBOUND_INTERVAL_SECONDS,
+        outbound_interval: float = OUTBOUND_INTERVAL_SECONDS,
+        inbound_batch_size: int = INBOUND_BATCH_SIZE,
+        outbound_batch_size: int = OUTBOUND_BATCH_SIZE,
+        inbound_concurrency: int = INBOUND_CONCURRENCY,
+        inbound_chunk_size: int = INBOUND_CHUNK_SIZE,
+        outbound_concurrency: int = OUTBOUND_CONCURRENCY,
+        idle_backoff_max: float = IDLE_BACKOFF_MAX_SECONDS,
+        idle_backoff_factor: float = IDLE_BACKOFF_FACTOR,
+        cycle_time_budget: float = CYCLE_TIME_BUDGET_SECONDS,
+        ingest_executor: Executor = None,
+        checkpoint: SyncCheckpoint = None,
+        shutdown_drain_seconds: float = SHUTDOWN_DRAIN_SECONDS,
+        shutdown_event: asyncio.Event = None,
+    ):
+        self.tracos_repo = tracos_repo or create_tracos_repository()
         self.client_repo = client_repo or ClientRepository()
         self.mapper = mapper or WorkorderMapper()
+        self.inbound_workers = inbound_workers
+        # A shared worker pool (multi-tenant mode); otherwise the ingestor starts its own
+        self.ingest_executor = ingest_executor
+        self.inbound_interval = inbound_interval
+        self.outbound_interval = outbound_interval
+        self.inbound_batch_size = inbound_batch_size
+        self.outbound_batch_size = outbound_batch_size
+        self.inbound_concurrency = max(inbound_concurrency, 1)
+        self.inbound_chunk_size = max(inbound_chunk_size, 1)
+        self.outbound_concurrency = max(outbound_concurrency, 1)
+        self.idle_backoff_max = idle_backoff_max
+        self.idle_backoff_factor = idle_backoff_factor
+        self.cycle_time_budget = cycle_time_budget
+        self._inbound_cursor = None
+        self.outbound_sync_mode = outbound_sync_mode
+        self.instance_id = instance_id
+        # Only watermark mode can skip the per-workorder isSynced write
+        self.mark_synced = mark_synced or outbound_sync_mode != "watermark"
+        self.watermark_lag = watermark_lag
+        self.metrics = SyncMetrics()
+        self._ingestor = None
+        self._connected = False
+        # Resume state across restarts; None disables checkpointing
+        self.checkpoint = checkpoint
+        self._inbound_fingerprints = {}
+        self.shutdown_drain_seconds = shutdown_drain_seconds
+        # Defaults to the module-level event set by the signal handlers in main()
+        self.shutdown_event = shutdown_event
 
     async def process_inbound(self):
-        """Process the inbound flow (Client → TracOS)"""
+        """Process the inbound flow (Client → TracOS).
+
+        Files are read and mapped chunk by chunk, and each chunk is persisted as soon as it
+        arrives, with at most inbound_concurrency chunks being written at a time.
+
+        Returns (workorders written, whether work was left over: files not yet read in the
+        current pass over the directory, or workorders deferred because the cycle ran out of
+        time). Unread files only count when the cycle wrote something: without a checkpoint
+        the same unchanged files are read again on every pass.
+        """
         logger.info("Starting inbound processing...")
+        budget = TimeBudget(self.cycle_time_budget)
+        written = deferred = collapsed = 0
+
+        if self.inbound_batch_size > 0:
+            file_names, more_files = self._next_inbound_files()
+        else:
+            file_names, more_files = self._list_inbound_files(), False
+        tracked = self.checkpoint is not None
+        # Files read in this cycle and the files behind each workorder, so only files that were
+        # read and whose workorders were all persisted are checkpointed
+        processed = []
+        sources = {}
+        # (updatedAt, file name) of the version of each workorder already sent this cycle
+        sent = {}
+        # The task writing each workorder, so a newer version from a later chunk is written after it
+        writing = {}
+        # Writes in flight and their batches
+        running = {}
+        unfinished = set()
 
-        # Get all workorders from client files
-        inbound_workorders = await self.client_repo.get_inbound_workorders()
-        logger.info(f"Found {len(inbound_workorders)} inbound workorders to process")
+        async def persist(batch, after):
+            nonlocal written, deferred
+            if after:
+                await asyncio.wait(after)
+            if budget.expired() or self._shutdown_requested():
+                # Left for the next cycle: the files are read again
+                deferred += len(batch)
+                unfinished.update(wo["number"] for wo in batch)
+                return
+            outcomes = await self._persist_inbound(batch)
+            for tracos_workorder, outcome in zip(batch, outcomes):
+                if outcome in (SAVE_CREATED, SAVE_UPDATED):
+                    written += 1
+                elif outcome not in (SAVE_UNCHANGED, SAVE_STALE):
+                    unfinished.add(tracos_workorder["number"])
 
-        for client_workorder in inbound_workorders:
+        try:
+            async for mapped, read in self._iter_inbound_chunks(file_names):
+                if tracked:
+                    processed.extend(read)
+                    for file_name, tracos_workorder in mapped:
+                        sources.setdefault(tracos_workorder["number"], []).append(file_name)
+                batch = self._coalesce_inbound(mapped, sent)
+                collapsed += len(mapped) - len(batch)
+                if not batch:
+                    continue
+
+                after = {writing[wo["number"]] for wo in batch if wo["number"] in writing and not writing[wo["number"]].done()}
+                task = asyncio.ensure_future(persist(batch, after))
+                running[task] = batch
+                task.add_done_callback(lambda done: running.pop(done, None))
+                for tracos_workorder in batch:
+                    writing[tracos_workorder["number"]] = task
+                if len(running) >= self.inbound_concurrency:
+                    # Backpressure: read the next chunk only once a write slot is free
+                    await asyncio.wait(list(running), return_when=asyncio.FIRST_COMPLETED)
+            if running:
+                await asyncio.wait(list(running))
+        finally:
+            for task, batch in list(running.items()):
+                # Cancelled mid-cycle: whatever was not written yet is read again next cycle
+                task.cancel()
+                unfinished.update(wo["number"] for wo in batch)
+            if tracked:
+                # Also runs when the cycle is cancelled mid-way, so finished files are not redone
+                self._checkpoint_inbound_files(processed, sources, unfinished)
+
+        if collapsed:
+            self.metrics.increment("inbound_duplicates_collapsed", collapsed)
+            logger.info(f"Collapsed {collapsed} duplicate inbound records")
+        if deferred:
+            logger.info(f"Inbound cycle deferred {deferred} workorders (time budget exhausted or shutting down)")
+        logger.info(
+            f"Inbound processing complete "
+            f"(saved: {self.metrics.get('inbound_saved')}, "
+            f"stale rejected: {self.metrics.get('inbound_stale_rejected')}, "
+            f"failed: {self.metrics.get('inbound_failed')})"
+        )
+        return written, deferred > 0 or (written > 0 and more_files)
+
+    def _list_inbound_files(self):
+        """List inbound files, leaving out those already persisted and unchanged since (checkpoint)"""
+        file_names = self.client_repo.list_inbound_files()
+        if self.checkpoint is None:
+            return file_names
+
+        self._inbound_fingerprints = {}
+        pending = []
+        for file_name in file_names:
             try:
-                tracos_workorder = self.mapper.client_to_tracos(client_workorder)
+                fingerprint = self.checkpoint.file_fingerprint(os.path.join(self.client_repo.inbound_dir, file_name))
+            except OSError:
+                continue
+            self._inbound_fingerprints[file_name] = fingerprint
+            if not self.checkpoint.inbound_file_done(file_name, fingerprint):
+                pending.append(file_name)
 
-                success = await self.tracos_repo.create_or_update_workorder(tracos_workorder)
+        skipped = len(file_names) - len(pending)
+        if skipped:
+            self.metrics.increment("inbound_files_skipped", skipped)
+            logger.info(f"Skipping {skipped} inbound files already persisted (checkpoint)")
+        return pending
 
-                if not success:
-                    logger.error(f"Failed to save workorder {client_workorder.get('orderNo', 'unknown')}")
-            except Exception as e:
-                logger.error(f"Error processing inbound workorder: {e}")
+    def _checkpoint_inbound_files(self, file_names, sources, unfinished):
+        """Record the files read this cycle, except those whose workorder still has to be written"""
+        unfinished_files = {file_name for number in unfinished for file_name in sources.get(number, [])}
+        done = {
+            file_name: self._inbound_fingerprints[file_name]
+            for file_name in file_names
+            if file_name not in unfinished_files and file_name in self._inbound_fingerprints
+        }
+        try:
+            self.checkpoint.mark_inbound_files(done, existing=self._inbound_fingerprints)
+        except OSError as e:
+            logger.warning(f"Could not save inbound checkpoint: {e}")
+
+    def _next_inbound_files(self):
+        """Pick the next inbound_batch_size files after the cursor, wrapping around at the end.
+
+        Returns (batch, whether files after the batch are left unread in the current pass).
+        """
+        file_names = self._list_inbound_files()
+        cursor = self._inbound_cursor
+        after = [name for name in file_names if cursor is None or name > cursor]
+        before = [name for name in file_names if cursor is not None and name <= cursor]
+
+        batch = (after + before)[:self.inbound_batch_size]
+        self._inbound_cursor = batch[-1] if batch else None
+        return batch, len(after) > self.inbound_batch_size
+
+    async def _iter_inbound_chunks(self, file_names):
+        """Yield ((file name, mapped workorder) pairs, names of the files processed) chunk by chunk.
+
+        Both ways read the files by name and map them with self.mapper, in worker processes
+        when inbound_workers > 1 and in this process otherwise. Files that could not be read,
+        or whose chunk failed in a worker, are not reported as processed.
+        """
+        if self.inbound_workers > 1:
+            if self._ingestor is None:
+                # Only pay for multiprocessing imports when parallel ingestion is enabled
+                from src.client.ingest import ParallelInboundIngestor
+                self._ingestor = ParallelInboundIngestor(self.client_repo, self.inbound_workers, self.inbound_chunk_size, executor=self.ingest_executor, mapper=self.mapper)
+            async for mapped in self._ingestor.iter_mapped_batches(file_names, with_file_names=True):
+                yield mapped
+            return
 
-        logger.info("Inbound processing complete")
+        from src.client.ingest import map_inbound_files
+        for start in range(0, len(file_names), self.inbound_chunk_size):
+            yield map_inbound_files(self.client_repo, file_names[start:start + self.inbound_chunk_size], self.mapper)
+
+    @staticmethod
+    def _coalesce_inbound(mapped, sent):
+        """Keep only the newest record per workorder number, so each order is written once.
+
+        Records are ranked on (updatedAt, file name): the client's lastUpdateDate, with ties
+        going to the file whose name sorts last. sent holds the rank of the version of each
+        workorder already sent this cycle, so a record from a later chunk is only kept when it
+        outranks it, and the result does not depend on the order in which chunks arrive.
+        """
+        latest = {}
+        for file_name, tracos_workorder in mapped:
+            number = tracos_workorder["number"]
+            rank = (tracos_workorder["updatedAt"], file_name)
+            current = latest.get(number)
+            if (current is None or rank > current[0]) and (number not in sent or rank > sent[number]):
+                latest[number] = (rank, tracos_workorder)
+
+        for number, (rank, _) in latest.items():
+            sent[number] = rank
+        return [tracos_workorder for _, tracos_workorder in latest.values()]
+
+    async def _persist_inbound(self, tracos_workorders):
+        """Save a batch of mapped workorders in one bulk call, returning their outcomes in order"""
+        for tracos_workorder in tracos_workorders:
+            # The client already holds this content, so outbound must not send it back
+            tracos_workorder["syncOrigin"] = "client"
+            tracos_workorder["clientHash"] = self.mapper.fingerprint(tracos_workorder)
+
+        try:
+            outcomes = await self.tracos_repo.save_workorders(tracos_workorders)
+        except Exception as e:
+            logger.error(f"Error persisting {len(tracos_workorders)} inbound workorders: {e}")
+            outcomes = [SAVE_FAILED] * len(tracos_workorders)
+
+        for tracos_workorder, outcome in zip(tracos_workorders, outcomes):
+            if outcome in (SAVE_CREATED, SAVE_UPDATED):
+                self.metrics.increment("inbound_saved")
+            elif outcome == SAVE_UNCHANGED:
+                self.metrics.increment("inbound_unchanged")
+            elif outcome == SAVE_STALE:
+                # An older client file than what is stored: expected, not a failure
+                self.metrics.increment("inbound_stale_rejected")
+            else:
+                self.metrics.increment("inbound_failed")
+                logger.error(f"Failed to save workorder {tracos_workorder.get('number', 'unknown')}")
+        return outcomes
 
     async def process_outbound(self):
-        """Process the outbound flow (TracOS → Client)"""
+        """Process the outbound flow (TracOS → Client).
+
+        Returns (workorders exported, whether more are waiting: a full batch or an exhausted time budget).
+        """
         logger.info("Starting outbound processing...")
+        budget = TimeBudget(self.cycle_time_budget)
+        handled = 0
+        out_of_time = False
 
-        # Get all unsynchronized workorders from TracOS
-        workorders = await self.tracos_repo.get_unsynchronized_workorders()
+        advanced_to = None
+        if self.outbound_sync_mode == "lease":
+            # Claim a batch so concurrent instances never export the same workorder
+            owner_id = self.instance_id
+            workorders = await self.tracos_repo.claim_unsynchronized_workorders(owner_id, self.outbound_batch_size, OUTBOUND_LEASE_SECONDS)
+        elif self.outbound_sync_mode == "watermark":
+            # Only read what changed since the last exported (updatedAt, _id)
+            owner_id = None
+            watermark = await self.tracos_repo.load_watermark()
+            # Stay watermark_lag behind the clock so changes still committing are not skipped
+            until = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(seconds=self.watermark_lag)
+            workorders = await self.tracos_repo.get_workorders_after(watermark, self.outbound_batch_size, until=until)
+        else:
+            # Get all unsynchronized workorders from TracOS
+            owner_id = None
+            workorders = await self.tracos_repo.get_unsynchronized_workorders(self.outbound_batch_size)
         logger.info(f"Found {len(workorders)} outbound workorders to process")
 
-        # Process each workorder
-        for tracos_workorder in workorders:
-            try:
-                client_workorder = self.mapper.tracos_to_client(tracos_workorder)
+        # Write in windows of outbound_concurrency; the cycle's exports are then checkpointed,
+        # marked and cleared together, so the checkpoint is saved twice per cycle, not per export
+        exports = []
+        for start in range(0, len(workorders), self.outbound_concurrency):
+            if self._shutdown_requested():
+                # Let in-flight windows finish but start no new ones; the rest resumes on restart
+                logger.info(f"Shutdown requested, {len(workorders) - start} outbound workorders deferred")
+                break
+            if budget.expired():
+                out_of_time = True
+                logger.info(f"Outbound cycle time budget exhausted, {len(workorders) - start} workorders deferred")
+                break
+            window = workorders[start:start + self.outbound_concurrency]
+            results = await asyncio.gather(*(self._write_export(wo) for wo in window))
+            exports.extend(zip(window, results))
+            if self.outbound_sync_mode == "watermark" and any(kind is None for kind, _ in results):
+                # Stop here so the failed workorder is retried from the watermark next cycle
+                break
 
-                success = await self.client_repo.write_outbound_workorder(client_workorder)
+        client_hashes = {}
+        done = await self._complete_exports(exports, owner_id, client_hashes)
+        handled = sum(done)
 
-                if success:
-                    await self.tracos_repo.mark_as_synced(str(tracos_workorder["_id"]))
-                else:
-                    logger.error(f"Failed to write outbound workorder {tracos_workorder.get('number', 'unknown')}")
+        covered_ids = []
+        if self.outbound_sync_mode == "watermark":
+            for (tracos_workorder, _), success in zip(exports, done):
+                if not success:
+                    break
+                advanced_to = {"updatedAt": tracos_workorder["updatedAt"], "_id": tracos_workorder["_id"]}
+                covered_ids.append(str(tracos_workorder["_id"]))
+
+        if client_hashes:
+            try:
+                await self.tracos_repo.record_client_hashes(client_hashes)
             except Exception as e:
-                logger.error(f"Error processing outbound workorder: {e}")
+                # A stale clientHash would suppress a later change back to an exported version as
+                # an echo, so export again from the old watermark instead (the checkpoint skips rewrites)
+                logger.error(f"Error recording client hashes, watermark not advanced: {e}")
+                advanced_to = None
+
+        if advanced_to:
+            await self.tracos_repo.save_watermark(advanced_to)
+            self._clear_exports(covered_ids)
+
+        logger.info(
+            f"Outbound processing complete "
+            f"(written: {self.metrics.get('outbound_written')}, "
+            f"echoes suppressed: {self.metrics.get('outbound_echo_suppressed')}, "
+            f"amplification: {self.amplification_ratio():.2f})"
+        )
+        # A batch that only produced failures is not a backlog worth spinning on
+        return handled, handled > 0 and (out_of_time or len(workorders) >= self.outbound_batch_size)
+
+    async def _write_export(self, tracos_workorder):
+        """Write one TracOS workorder to the client.
+
+        Returns (kind, client hash): kind is "echo" when the client already holds this version,
+        "resumed" when it was written before an interruption, "written", or None on failure.
+        """
+        try:
+            client_hash = self.mapper.fingerprint(tracos_workorder)
+            if tracos_workorder.get("clientHash") == client_hash:
+                # Echo of a client change (or an already exported version): nothing new to send
+                return "echo", client_hash
+
+            pending = self.checkpoint.pending_export(str(tracos_workorder["_id"])) if self.checkpoint is not None else None
+            if pending and pending["clientHash"] == client_hash:
+                # Written before an interruption, only the sync marking is missing
+                return "resumed", client_hash
+
+            client_workorder = self.mapper.tracos_to_client(tracos_workorder)
+            if await self.client_repo.write_outbound_workorder(client_workorder):
+                return "written", client_hash
+
+            self.metrics.increment("outbound_failed")
+            logger.error(f"Failed to write outbound workorder {tracos_workorder.get('number', 'unknown')}")
+        except Exception as e:
+            self.metrics.increment("outbound_failed")
+            logger.error(f"Error processing outbound workorder: {e}")
+        return None, None
+
+    async def _complete_exports(self, exports, owner_id=None, client_hashes=None):
+        """Checkpoint, mark and count the (workorder, (kind, client hash)) exports of a cycle.
+
+        Written workorders are checkpointed in one save before any is marked, and the marked
+        ones are cleared in one more save. Without the isSynced write, exported client hashes
+        are left in client_hashes for the caller to store in bulk. Returns whether each is done.
+        """
+        self._record_exports({str(wo["_id"]): client_hash for wo, (kind, client_hash) in exports if kind == "written"}, owner_id)
+
+        marks = [True] * len(exports)
+        if self.mark_synced:
+            to_mark = [(index, wo, client_hash) for index, (wo, (kind, client_hash)) in enumerate(exports) if kind]
+            for start in range(0, len(to_mark), self.outbound_concurrency):
+                window = to_mark[start:start + self.outbound_concurrency]
+                results = await asyncio.gather(*(self._mark_synced(str(wo["_id"]), owner_id, client_hash) for _, wo, client_hash in window))
+                for (index, _, _), marked in zip(window, results):
+                    marks[index] = marked
+
+        done, cleared = [], []
+        for (tracos_workorder, (kind, client_hash)), marked in zip(exports, marks):
+            workorder_id = str(tracos_workorder["_id"])
+            if kind is None:
+                done.append(False)
+            elif marked:
+                done.append(True)
+                if kind == "echo":
+                    self.metrics.increment("outbound_echo_suppressed")
+                    continue
+                self.metrics.increment("outbound_resumed" if kind == "resumed" else "outbound_written")
+                if self.mark_synced:
+                    cleared.append(workorder_id)
+                elif client_hashes is not None:
+                    client_hashes[workorder_id] = client_hash
+            elif owner_id is not None:
+                # Another instance claimed it meanwhile and exports whatever version is current
+                done.append(False)
+                cleared.append(workorder_id)
+                self.metrics.increment("outbound_lease_lost")
+            else:
+                # Kept in the checkpoint: the next cycle only retries the marking
+                done.append(False)
+                self.metrics.increment("outbound_failed")
+                logger.error(f"Failed to mark outbound workorder {tracos_workorder.get('number', 'unknown')} as synced")
 
-        logger.info("Outbound processing complete")
+        self._clear_exports(cleared)
+        return done
+
+    async def _mark_synced(self, workorder_id, owner_id, client_hash) -> bool:
+        try:
+            return await self.tracos_repo.mark_as_synced(workorder_id, owner_id=owner_id, client_hash=client_hash)
+        except Exception as e:
+            logger.error(f"Error marking workorder {workorder_id} as synced: {e}")
+            return False
+
+    def _record_exports(self, client_hashes, owner_id=None):
+        if self.checkpoint is None or not client_hashes:
+            return
+        try:
+            self.checkpoint.record_exports(client_hashes, owner_id)
+        except OSError as e:
+            logger.warning(f"Could not save outbound checkpoint: {e}")
+
+    def _clear_exports(self, workorder_ids):
+        if self.checkpoint is None or not workorder_ids:
+            return
+        try:
+            self.checkpoint.clear_exports(workorder_ids)
+        except OSError as e:
+            logger.warning(f"Could not save outbound checkpoint: {e}")
+
+    def _shutdown_signal(self) -> asyncio.Event:
+        return self.shutdown_event or shutdown_event
+
+    def _shutdown_requested(self) -> bool:
+        return self._shutdown_signal().is_set()
+
+    def amplification_ratio(self) -> float:
+        """Outbound files written per inbound change saved since the service started"""
+        return self.metrics.ratio("outbound_written", "inbound_saved")
+
+    async def connect(self):
+        """Connect to TracOS unless this service already holds a connection"""
+        if not self._connected:
+            await self.tracos_repo.connect()
+            self._connected = True
+
+    async def disconnect(self):
+        if self._connected:
+            await self.tracos_repo.disconnect()
+            self._connected = False
 
     async def run_once(self):
         """Run the integration flow once"""
         try:
-            await self.tracos_repo.connect()
+            await self.connect()
             # Process inbound first, then outbound
             await self.process_inbound()
             await self.process_outbound()
         except Exception as e:
             logger.error(f"Error running integration flow: {e}")
         finally:
-            await self.tracos_repo.disconnect()
+            await self.disconnect()
 
-    async def run_continuously(self, interval_seconds=60):
-        """Run the integration flow continuously with a specified interval"""
-        logger.info(f"Starting continuous integration flow (interval: {interval_seconds}s)")
+    async def run_continuously(self, interval_seconds=None):
+        """Run inbound and outbound as independent loops on a shared connection until shutdown"""
+        inbound_interval = interval_seconds or self.inbound_interval
+        outbound_interval = interval_seconds or self.outbound_interval
+        logger.info(f"Starting continuous integration flow (inbound interval: {inbound_interval}s, outbound interval: {outbound_interval}s)")
 
         try:
-            while not shutdown_event.is_set():
-                await self.run_once()
-                try:
-                    await asyncio.wait_for(
-                        shutdown_event.wait(),
-                        timeout=interval_seconds
-                    )
-                except asyncio.TimeoutError:
-                    pass
+            await self.connect()
+            flows = asyncio.gather(
+                self._run_flow("inbound", self.process_inbound, inbound_interval),
+                self._run_flow("outbound", self.process_outbound, outbound_interval),
+            )
+            await self.drain_on_shutdown(flows)
+        except Exception as e:
+            logger.error(f"Error running integration flow: {e}")
         finally:
+            await self.disconnect()
             logger.info("Integration service shutting down")
 
+    async def drain_on_shutdown(self, work: asyncio.Future):
+        """Wait for work; once shutdown is requested give it shutdown_drain_seconds, then cancel it"""
+        stop = asyncio.ensure_future(self._shutdown_signal().wait())
+        try:
+            await asyncio.wait({work, stop}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            stop.cancel()
+        if work.done():
+            return work.result()
+
+        logger.info(f"Draining in-flight work (up to {self.shutdown_drain_seconds}s)...")
+        try:
+            return await asyncio.wait_for(work, timeout=self.shutdown_drain_seconds)
+        except asyncio.TimeoutError:
+            # Finished exports are checkpointed, so the next start picks up where this one stopped
+            logger.warning("Shutdown drain deadline reached, cancelled in-flight work")
+
+    def flow_schedule(self, interval_seconds) -> AdaptiveSchedule:
+        return AdaptiveSchedule(interval_seconds, self.idle_backoff_max, self.idle_backoff_factor)
+
+    async def run_cycle(self, name, process):
+        """Run one cycle of a flow, returning (processed, has_backlog) even when it fails"""
+        try:
+            return await process()
+        except Exception as e:
+            logger.error(f"Error running {name} flow: {e}")
+            return 0, False
+
+    async def _run_flow(self, name, process, interval_seconds):
+        """Run one flow on an adaptive schedule until shutdown_event is set"""
+        schedule = self.flow_schedule(interval_seconds)
+        while not self._shutdown_requested():
+            processed, has_backlog = await self.run_cycle(name, process)
+
+            delay = schedule.next_delay(processed, has_backlog)
+            if delay <= 0:
+                # Backlog left: go again, but let the other flow run first
+                await asyncio.sleep(0)
+                continue
+            try:
+                await asyncio.wait_for(
+                    self._shutdown_signal().wait(),
+                    timeout=delay
+                )
+            except asyncio.TimeoutError:
+                pass
+        logger.info(f"{name.capitalize()} flow stopped")
+
+    def close(self):
+        """Release resources held for the lifetime of the service"""
+        if self._ingestor is not None:
+            self._ingestor.shutdown()
+            self._ingestor = None
+
+async def run_tenants(tenants_file: str):
+    """Serve every tenant in the registry from this process"""
+    from src.tenants import MultiTenantService, load_tenants
+
+    tenants = load_tenants(tenants_file)
+    logger.info(f"Multi-tenant mode: {len(tenants)} tenants from {tenants_file} (backend: {TRACOS_BACKEND})")
+    service = MultiTenantService(tenants)
+    try:
+        await service.connect()
+    except Exception:
+        logger.error("Failed to connect to TracOS repository")
+        exit(1)
+
+    if RUN_MODE == "continuous":
+        await service.run_continuously(shutdown_event)
+    else:
+        await service.run_once(shutdown_event)
+
+    service.close()
+    logger.info("Integration flow completed")
+
 async def main():
-    load_dotenv()
     setup_logging()
 
     def handle_signal(sig, frame):
@@ -110,24 +641,30 @@ async def main():
 
     # Log startup message
     logger.info("Starting TracOS ↔ Client Integration Flow")
-    logger.info(f"Using inbound directory: {os.environ.get('DATA_INBOUND_DIR', './data/inbound')}")
-    logger.info(f"Using outbound directory: {os.environ.get('DATA_OUTBOUND_DIR', './data/outbound')}")
-    logger.info(f"Using MongoDB URI: {os.environ.get('MONGO_URI', 'mongodb://localhost:27017/tractian')}")
+    if TENANTS_FILE:
+        await run_tenants(TENANTS_FILE)
+        return
+
+    ensure_data_dirs()
+    logger.info(f"Using inbound directory: {DATA_INBOUND_DIR}")
+    logger.info(f"Using outbound directory: {DATA_OUTBOUND_DIR}")
+    logger.info(f"Using TracOS backend: {TRACOS_BACKEND}" + (f" ({MONGO_URI})" if TRACOS_BACKEND == "mongo" else ""))
 
-    # Create and run the integration service
+    # Create and run the integration service; the connection opened here is reused by the run
     try:
-        service = IntegrationService()
-        await service.tracos_repo.connect()
+        checkpoint = SyncCheckpoint(CHECKPOINT_DIR) if CHECKPOINT_DIR else None
+        service = IntegrationService(checkpoint=checkpoint)
+        await service.connect()
     except Exception:
         logger.error("Failed to connect to TracOS repository")
         exit(1)
 
-    if os.getenv("RUN_MODE", "once") == "continuous":
-        interval = int(os.getenv("SYNC_INTERVAL_SECONDS", "60"))
-        await service.run_continuously(interval)
+    if RUN_MODE == "continuous":
+        await service.run_continuously()
     else:
         await service.run_once()
 
+    service.close()
     logger.info("Integration flow completed")
 
 if __name__ == "__main__":
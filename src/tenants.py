@@ -0,0 +1,279 @@
+"""Multi-tenant mode: sync many client directories/collections from one process"""
+import asyncio
+import heapq
+import json
+import os
+import time
+from concurrent.futures import Executor
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+from src.config import (
+    CHECKPOINT_DIR,
+    INBOUND_WORKERS,
+    MONGO_COLLECTION,
+    MONGO_DATABASE,
+    MONGO_STATE_COLLECTION,
+    MONGO_URI,
+    SHUTDOWN_DRAIN_SECONDS,
+    SQLITE_PATH,
+    TENANT_CONCURRENCY,
+    TRACOS_BACKEND,
+    ensure_data_dirs,
+)
+from src.client.repository import ClientRepository
+from src.tracos.base import TracOSStore
+from src.tracos.factory import create_tracos_repository
+from src.utils.checkpoint import SyncCheckpoint
+from src.main import IntegrationService
+
+
+class Tenant:
+    """One customer: its own client directories and TracOS database/collection"""
+
+    def __init__(
+        self,
+        name: str,
+        inbound_dir: str,
+        outbound_dir: str,
+        database: str = MONGO_DATABASE,
+        collection: str = MONGO_COLLECTION,
+        state_collection: str = MONGO_STATE_COLLECTION,
+    ):
+        # The name is used as a file name (checkpoint directory, SQLite file), so it must stay one
+        if not isinstance(name, str) or name in ("", ".", "..") or "/" in name or "\\" in name:
+            raise ValueError(f"Invalid tenant name {name!r}: it must not contain path separators or be '.' or '..'")
+        self.name = name
+        self.inbound_dir = inbound_dir
+        self.outbound_dir = outbound_dir
+        self.database = database
+        self.collection = collection
+        self.state_collection = state_collection
+
+    @classmethod
+    def from_dict(cls, entry: Dict[str, Any]) -> "Tenant":
+        missing = [key for key in ("name", "inbound_dir", "outbound_dir") if not entry.get(key)]
+        if missing:
+            raise ValueError(f"Tenant entry {entry} is missing {', '.join(missing)}")
+        return cls(
+            name=entry["name"],
+            inbound_dir=entry["inbound_dir"],
+            outbound_dir=entry["outbound_dir"],
+            database=entry.get("database", MONGO_DATABASE),
+            collection=entry.get("collection", MONGO_COLLECTION),
+            state_collection=entry.get("state_collection", MONGO_STATE_COLLECTION),
+        )
+
+
+def load_tenants(path: str) -> List[Tenant]:
+    """Read the tenant registry: a JSON list of {name, inbound_dir, outbound_dir, database?, collection?, state_collection?}"""
+    with open(path, "r") as f:
+        entries = json.load(f)
+    if not isinstance(entries, list) or not entries:
+        raise ValueError(f"Tenant registry {path} must be a non-empty JSON list")
+
+    tenants = [Tenant.from_dict(entry) for entry in entries]
+    names = [tenant.name for tenant in tenants]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"Duplicate tenant names in {path}: {', '.join(duplicates)}")
+    return tenants
+
+
+class MultiTenantService:
+    """Runs one IntegrationService per tenant on a shared connection pool, worker pool and scheduler"""
+
+    def __init__(
+        self,
+        tenants: List[Tenant],
+        backend: str = TRACOS_BACKEND,
+        mongo_uri: str = MONGO_URI,
+        inbound_workers: int = INBOUND_WORKERS,
+        tenant_concurrency: int = TENANT_CONCURRENCY,
+        checkpoint_dir: str = CHECKPOINT_DIR,
+        shutdown_drain_seconds: float = SHUTDOWN_DRAIN_SECONDS,
+        **service_options,
+    ):
+        self.tenants = tenants
+        self.backend = backend
+        self.mongo_uri = mongo_uri
+        self.tenant_concurrency = max(tenant_concurrency, 1)
+        self.shutdown_drain_seconds = shutdown_drain_seconds
+        self._mongo_client = None
+        self._connected = False
+        self._executor: Optional[Executor] = None
+        if inbound_workers > 1:
+            # One pool for every tenant instead of a pool per tenant
+            from concurrent.futures import ProcessPoolExecutor
+            self._executor = ProcessPoolExecutor(max_workers=inbound_workers)
+
+        self.services: Dict[str, IntegrationService] = {
+            tenant.name: IntegrationService(
+                tracos_repo=self._create_store(tenant),
+                client_repo=ClientRepository(tenant.inbound_dir, tenant.outbound_dir),
+                inbound_workers=inbound_workers,
+                ingest_executor=self._executor,
+                # Each tenant resumes from its own checkpoint
+                checkpoint=SyncCheckpoint(os.path.join(checkpoint_dir, tenant.name)) if checkpoint_dir else None,
+                **service_options,
+            )
+            for tenant in tenants
+        }
+
+    def _create_store(self, tenant: Tenant) -> TracOSStore:
+        if self.backend == "mongo":
+            from src.tracos.repository import TracOSRepository, _motor_client_class
+            if self._mongo_client is None:
+                # Motor connects lazily, so creating the shared client here does no I/O
+                self._mongo_client = _motor_client_class()(self.mongo_uri, serverSelectionTimeoutMS=5000)
+            return TracOSRepository(
+                db_name=tenant.database,
+                collection_name=tenant.collection,
+                state_collection_name=tenant.state_collection,
+                client=self._mongo_client,
+            )
+        if self.backend == "sqlite":
+            sqlite_path = os.path.join(os.path.dirname(SQLITE_PATH), f"{tenant.name}.sqlite3")
+            return create_tracos_repository(self.backend, sqlite_path=sqlite_path)
+        return create_tracos_repository(self.backend)
+
+    async def connect(self):
+        """Check the shared connection once, then bind every tenant's store to it"""
+        if self._connected:
+            return
+        if self._mongo_client is not None:
+            await self._mongo_client.admin.command("ping")
+            logger.info(f"Connected to MongoDB, shared by {len(self.tenants)} tenants")
+        for tenant in self.tenants:
+            ensure_data_dirs(tenant.inbound_dir, tenant.outbound_dir)
+            await self.services[tenant.name].connect()
+        self._connected = True
+
+    async def disconnect(self):
+        self._connected = False
+        for service in self.services.values():
+            await service.disconnect()
+        if self._mongo_client is not None:
+            self._mongo_client.close()
+            self._mongo_client = None
+            logger.info("MongoDB connection closed")
+
+    async def run_once(self, shutdown_event: Optional[asyncio.Event] = None):
+        """Run inbound then outbound once for every tenant, at most tenant_concurrency at a time"""
+        self._use_shutdown_event(shutdown_event)
+        semaphore = asyncio.Semaphore(self.tenant_concurrency)
+
+        async def run_tenant(name, service):
+            async with semaphore:
+                with logger.contextualize(tenant=name):
+                    await service.run_cycle("inbound", service.process_inbound)
+                    await service.run_cycle("outbound", service.process_outbound)
+
+        try:
+            await self.connect()
+            await asyncio.gather(*(run_tenant(name, service) for name, service in self.services.items()))
+        except Exception as e:
+            logger.error(f"Error running multi-tenant integration flow: {e}")
+        finally:
+            await self.disconnect()
+            self.log_metrics()
+
+    async def run_continuously(self, shutdown_event: asyncio.Event):
+        """Drive every tenant's flows from one timer queue until shutdown_event is set.
+
+        Each (tenant, flow) is a job with its own adaptive schedule. Due jobs run oldest-due
+        first, at most tenant_concurrency at a time, and a job with a backlog is re-queued
+        behind the jobs already waiting, so a busy tenant cannot starve the others.
+        """
+        logger.info(f"Starting multi-tenant integration flow for {len(self.tenants)} tenants")
+        self._use_shutdown_event(shutdown_event)
+        queue = []
+        sequence = 0
+        schedules = {}
+        now = time.monotonic()
+        for name, service in self.services.items():
+            for flow, interval in (("inbound", service.inbound_interval), ("outbound", service.outbound_interval)):
+                schedules[(name, flow)] = service.flow_schedule(interval)
+                heapq.heappush(queue, (now, sequence, name, flow))
+                sequence += 1
+
+        semaphore = asyncio.Semaphore(self.tenant_concurrency)
+        requeued = asyncio.Event()
+        running = set()
+
+        async def run_job(name, flow):
+            nonlocal sequence
+            service = self.services[name]
+            process = service.process_inbound if flow == "inbound" else service.process_outbound
+            try:
+                with logger.contextualize(tenant=name):
+                    processed, has_backlog = await service.run_cycle(flow, process)
+            finally:
+                semaphore.release()
+            delay = schedules[(name, flow)].next_delay(processed, has_backlog)
+            heapq.heappush(queue, (time.monotonic() + delay, sequence, name, flow))
+            sequence += 1
+            requeued.set()
+
+        try:
+            await self.connect()
+            while not shutdown_event.is_set():
+                if queue and queue[0][0] <= time.monotonic():
+                    await semaphore.acquire()
+                    if shutdown_event.is_set():
+                        # Shutdown was requested while waiting for a free slot
+                        semaphore.release()
+                        break
+                    _, _, name, flow = heapq.heappop(queue)
+                    task = asyncio.create_task(run_job(name, flow))
+                    running.add(task)
+                    task.add_done_callback(running.discard)
+                    continue
+
+                # Sleep until the next job is due, a job is re-queued or shutdown is requested
+                timeout = max(queue[0][0] - time.monotonic(), 0) if queue else None
+                requeued.clear()
+                waiters = [asyncio.ensure_future(shutdown_event.wait()), asyncio.ensure_future(requeued.wait())]
+                await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for waiter in waiters:
+                    waiter.cancel()
+
+            if running:
+                # Cycles in flight stop starting new work; give them a bounded time to finish
+                logger.info(f"Draining {len(running)} in-flight tenant cycles (up to {self.shutdown_drain_seconds}s)...")
+                _, pending = await asyncio.wait(running, timeout=self.shutdown_drain_seconds)
+                for task in pending:
+                    task.cancel()
+                if pending:
+                    logger.warning(f"Shutdown drain deadline reached, cancelled {len(pending)} tenant cycles")
+                    await asyncio.gather(*pending, return_exceptions=True)
+        except Exception as e:
+            logger.error(f"Error running multi-tenant integration flow: {e}")
+        finally:
+            await self.disconnect()
+            self.log_metrics()
+            logger.info("Multi-tenant integration service shutting down")
+
+    def _use_shutdown_event(self, shutdown_event: Optional[asyncio.Event]):
+        # Tenant cycles check this event to stop starting new work during shutdown
+        if shutdown_event is not None:
+            for service in self.services.values():
+                service.shutdown_event = shutdown_event
+
+    def metrics_snapshot(self) -> Dict[str, Dict[str, int]]:
+        """Per-tenant counters, keyed by tenant name"""
+        return {name: service.metrics.snapshot() for name, service in self.services.items()}
+
+    def log_metrics(self):
+        for name, counters in self.metrics_snapshot().items():
+            summary = ", ".join(f"{key}: {value}" for key, value in sorted(counters.items())) or "no activity"
+            logger.info(f"Tenant {name}: {summary}")
+
+    def close(self):
+        """Release the shared worker pool"""
+        for service in self.services.values():
+            service.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
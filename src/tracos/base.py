@@ -0,0 +1,144 @@
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from loguru import logger
+
+# Outcomes of TracOSStore.save_workorder
+SAVE_CREATED = "created"
+SAVE_UPDATED = "updated"
+SAVE_UNCHANGED = "unchanged"
+SAVE_STALE = "stale"
+SAVE_FAILED = "failed"
+
+def _now() -> datetime:
+    # Match what MongoDB hands back: naive UTC with millisecond precision
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+class TracOSStore(ABC):
+    """Async storage interface for TracOS workorders used by IntegrationService.
+
+    Backends implement the round-trips; the delta and staleness rules shared by every
+    backend live here so they behave identically.
+    """
+
+    LEASE_FIELDS = {"leaseOwner": "", "leaseToken": "", "leaseExpiresAt": ""}
+    # Fields owned by the store: never part of the delta sent by an inbound update
+    MANAGED_FIELDS = ("_id", "createdAt", "updatedAt", "isSynced", "syncedAt")
+    # Sync markers that are stored when they change, but are not a change to the workorder itself
+    MARKER_FIELDS = ("syncOrigin", "clientHash", "sourceUpdatedAt")
+
+    @abstractmethod
+    async def connect(self):
+        """Open the connection to the backend"""
+
+    @abstractmethod
+    async def disconnect(self):
+        """Close the connection to the backend"""
+
+    async def ensure_indexes(self):
+        """Create whatever indexes the backend needs; a no-op by default"""
+
+    @abstractmethod
+    async def get_unsynchronized_workorders(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """Get up to limit workorders that have not been synchronized yet"""
+
+    @abstractmethod
+    async def claim_unsynchronized_workorders(self, owner_id: str, batch_size: int = 100, lease_seconds: int = 300) -> List[Dict[str, Any]]:
+        """Lease a batch of unsynchronized workorders to owner_id"""
+
+    @abstractmethod
+    async def get_workorders_after(self, watermark: Optional[Dict[str, Any]], limit: int = 100, until: datetime = None) -> List[Dict[str, Any]]:
+        """Get workorders changed after the (updatedAt, _id) watermark and before until (if given), oldest first"""
+
+    @abstractmethod
+    async def get_latest_watermark(self) -> Optional[Dict[str, Any]]:
+        """Return the (updatedAt, _id) of the most recently changed workorder"""
+
+    @abstractmethod
+    async def load_watermark(self, name: str = "outbound") -> Optional[Dict[str, Any]]:
+        """Load a persisted watermark, or None when the scan should start from the beginning"""
+
+    @abstractmethod
+    async def save_watermark(self, watermark: Dict[str, Any], name: str = "outbound") -> bool:
+        """Persist a watermark"""
+
+    @abstractmethod
+    async def reset_watermark(self, name: str = "outbound"):
+        """Drop a watermark so the next scan starts from the beginning"""
+
+    @abstractmethod
+    async def save_workorder(self, workorder: Dict[str, Any]) -> str:
+        """Create or update a workorder, returning one of the SAVE_* outcomes"""
+
+    @abstractmethod
+    async def mark_as_synced(self, workorder_id: str, owner_id: str = None, client_hash: str = None) -> bool:
+        """Mark a workorder as synchronized, releasing the lease held by owner_id if given"""
+
+    @abstractmethod
+    async def record_client_hashes(self, client_hashes: Dict[str, str]) -> int:
+        """Store the clientHash of several workorders (by id) without touching updatedAt or isSynced.
+
+        Returns how many were found; raises if the write fails.
+        """
+
+    async def create_or_update_workorder(self, workorder: Dict[str, Any]) -> bool:
+        """Create a new workorder or update an existing one"""
+        return await self.save_workorder(workorder) != SAVE_FAILED
+
+    async def save_workorders(self, workorders: List[Dict[str, Any]]) -> List[str]:
+        """Save several workorders, returning their outcomes in order"""
+        return [await self.save_workorder(workorder) for workorder in workorders]
+
+    async def mark_many_as_synced(self, workorder_ids: List[str], owner_id: str = None) -> int:
+        """Mark several workorders as synchronized, returning how many were marked"""
+        marked = 0
+        for workorder_id in workorder_ids:
+            marked += bool(await self.mark_as_synced(workorder_id, owner_id=owner_id))
+        return marked
+
+    async def iter_workorders_after(self, watermark: Optional[Dict[str, Any]], batch_size: int = 100) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Stream every workorder after watermark in (updatedAt, _id) order, batch by batch"""
+        while True:
+            batch = await self.get_workorders_after(watermark, batch_size)
+            if not batch:
+                return
+            yield batch
+            watermark = {"updatedAt": batch[-1]["updatedAt"], "_id": batch[-1]["_id"]}
+
+    def _is_stale(self, existing: Dict[str, Any], workorder: Dict[str, Any]) -> bool:
+        stored, incoming = existing.get("sourceUpdatedAt"), workorder.get("sourceUpdatedAt")
+        if not isinstance(stored, datetime) or not isinstance(incoming, datetime):
+            return False
+        return self._to_stored_precision(incoming) < self._to_stored_precision(stored)
+
+    @staticmethod
+    def _lease_lost(workorder_id: str) -> bool:
+        logger.warning(f"Lease on workorder {workorder_id} was lost before it could be marked as synced")
+        return False
+
+    def compute_delta(self, existing: Dict[str, Any], workorder: Dict[str, Any]) -> Dict[str, Any]:
+        """Return the fields of workorder whose values differ from the stored document"""
+        return {
+            field: value
+            for field, value in workorder.items()
+            if field not in self.MANAGED_FIELDS and not self._values_equal(existing.get(field), value)
+        }
+
+    def changes_content(self, changes: Dict[str, Any]) -> bool:
+        """Whether a delta touches the workorder itself rather than only sync markers"""
+        return any(field not in self.MARKER_FIELDS for field in changes)
+
+    @staticmethod
+    def _values_equal(stored, incoming) -> bool:
+        if isinstance(stored, datetime) and isinstance(incoming, datetime):
+            # Stores return naive UTC datetimes truncated to milliseconds
+            return TracOSStore._to_stored_precision(stored) == TracOSStore._to_stored_precision(incoming)
+        return stored == incoming
+
+    @staticmethod
+    def _to_stored_precision(value: datetime) -> datetime:
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.replace(microsecond=value.microsecond // 1000 * 1000)
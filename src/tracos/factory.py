@@ -0,0 +1,24 @@
+from loguru import logger
+
+from src.config import SQLITE_PATH, TRACOS_BACKEND, TRACOS_LATENCY_MS
+from src.tracos.base import TracOSStore
+
+def create_tracos_repository(backend: str = TRACOS_BACKEND, latency_ms: float = TRACOS_LATENCY_MS, sqlite_path: str = SQLITE_PATH) -> TracOSStore:
+    """Build the TracOS store selected by TRACOS_BACKEND, optionally wrapped with injected latency"""
+    if backend == "memory":
+        from src.tracos.memory import InMemoryTracOSRepository
+        repo = InMemoryTracOSRepository()
+    elif backend == "sqlite":
+        from src.tracos.sqlite import SQLiteTracOSRepository
+        repo = SQLiteTracOSRepository(sqlite_path)
+    elif backend == "mongo":
+        from src.tracos.repository import TracOSRepository
+        repo = TracOSRepository()
+    else:
+        raise ValueError(f"Unknown TRACOS_BACKEND: {backend}")
+
+    if latency_ms > 0:
+        from src.tracos.latency import LatencyInjectingRepository
+        logger.info(f"Injecting {latency_ms}ms of latency into every TracOS round-trip")
+        repo = LatencyInjectingRepository(repo, latency_ms / 1000)
+    return repo
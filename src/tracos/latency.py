@@ -0,0 +1,80 @@
+import asyncio
+import random
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from src.tracos.base import TracOSStore
+
+class LatencyInjectingRepository(TracOSStore):
+    """Wraps a TracOS store and delays every round-trip, to measure how DB latency shapes throughput.
+
+    Every call the inner store makes in one round-trip (including the bulk save_workorders
+    and mark_many_as_synced) is forwarded as is and pays the latency once; the streaming
+    helper inherited from TracOSStore pays it once per batch it reads.
+    """
+
+    def __init__(self, inner: TracOSStore, latency_seconds: float, jitter_seconds: float = 0.0):
+        self.inner = inner
+        self.latency_seconds = latency_seconds
+        self.jitter_seconds = jitter_seconds
+
+    async def _delay(self):
+        await asyncio.sleep(self.latency_seconds + random.uniform(0, self.jitter_seconds))
+
+    async def connect(self):
+        await self.inner.connect()
+
+    async def disconnect(self):
+        await self.inner.disconnect()
+
+    async def ensure_indexes(self):
+        await self._delay()
+        await self.inner.ensure_indexes()
+
+    async def get_unsynchronized_workorders(self, limit: int = 100) -> List[Dict[str, Any]]:
+        await self._delay()
+        return await self.inner.get_unsynchronized_workorders(limit)
+
+    async def claim_unsynchronized_workorders(self, owner_id: str, batch_size: int = 100, lease_seconds: int = 300) -> List[Dict[str, Any]]:
+        await self._delay()
+        return await self.inner.claim_unsynchronized_workorders(owner_id, batch_size, lease_seconds)
+
+    async def get_workorders_after(self, watermark: Optional[Dict[str, Any]], limit: int = 100, until: datetime = None) -> List[Dict[str, Any]]:
+        await self._delay()
+        return await self.inner.get_workorders_after(watermark, limit, until)
+
+    async def get_latest_watermark(self) -> Optional[Dict[str, Any]]:
+        await self._delay()
+        return await self.inner.get_latest_watermark()
+
+    async def load_watermark(self, name: str = "outbound") -> Optional[Dict[str, Any]]:
+        await self._delay()
+        return await self.inner.load_watermark(name)
+
+    async def save_watermark(self, watermark: Dict[str, Any], name: str = "outbound") -> bool:
+        await self._delay()
+        return await self.inner.save_watermark(watermark, name)
+
+    async def reset_watermark(self, name: str = "outbound"):
+        await self._delay()
+        await self.inner.reset_watermark(name)
+
+    async def save_workorder(self, workorder: Dict[str, Any]) -> str:
+        await self._delay()
+        return await self.inner.save_workorder(workorder)
+
+    async def save_workorders(self, workorders: List[Dict[str, Any]]) -> List[str]:
+        await self._delay()
+        return await self.inner.save_workorders(workorders)
+
+    async def mark_as_synced(self, workorder_id: str, owner_id: str = None, client_hash: str = None) -> bool:
+        await self._delay()
+        return await self.inner.mark_as_synced(workorder_id, owner_id=owner_id, client_hash=client_hash)
+
+    async def mark_many_as_synced(self, workorder_ids: List[str], owner_id: str = None) -> int:
+        await self._delay()
+        return await self.inner.mark_many_as_synced(workorder_ids, owner_id=owner_id)
+
+    async def record_client_hashes(self, client_hashes: Dict[str, str]) -> int:
+        await self._delay()
+        return await self.inner.record_client_hashes(client_hashes)
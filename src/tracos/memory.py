@@ -0,0 +1,129 @@
+import heapq
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+from loguru import logger
+
+from src.tracos.base import (
+    SAVE_CREATED,
+    SAVE_STALE,
+    SAVE_UNCHANGED,
+    SAVE_UPDATED,
+    TracOSStore,
+    _now,
+)
+
+class InMemoryTracOSRepository(TracOSStore):
+    """TracOS store kept in process memory, for local benchmarks and load tests without MongoDB"""
+
+    def __init__(self):
+        self.documents: Dict[ObjectId, Dict[str, Any]] = {}
+        self.ids_by_number: Dict[int, ObjectId] = {}
+        self.watermarks: Dict[str, Dict[str, Any]] = {}
+
+    async def connect(self):
+        logger.info("Using in-memory TracOS store")
+
+    async def disconnect(self):
+        pass
+
+    async def get_unsynchronized_workorders(self, limit: int = 100) -> List[Dict[str, Any]]:
+        unsynced = []
+        for document in self.documents.values():
+            if document.get("isSynced") is False:
+                unsynced.append(dict(document))
+                if len(unsynced) >= limit:
+                    break
+        return unsynced
+
+    async def claim_unsynchronized_workorders(self, owner_id: str, batch_size: int = 100, lease_seconds: int = 300) -> List[Dict[str, Any]]:
+        now = _now()
+        lease_token = str(ObjectId())
+        claimed = []
+        for document in self.documents.values():
+            if document.get("isSynced") is not False:
+                continue
+            if document.get("leaseExpiresAt") is not None and document["leaseExpiresAt"] >= now:
+                continue
+            document.update({"leaseOwner": owner_id, "leaseToken": lease_token, "leaseExpiresAt": now + timedelta(seconds=lease_seconds)})
+            claimed.append(dict(document))
+            if len(claimed) >= batch_size:
+                break
+        return claimed
+
+    async def get_workorders_after(self, watermark: Optional[Dict[str, Any]], limit: int = 100, until: datetime = None) -> List[Dict[str, Any]]:
+        after = None if watermark is None else (watermark["updatedAt"], watermark["_id"])
+        candidates = (
+            document for document in self.documents.values()
+            if (after is None or (document["updatedAt"], document["_id"]) > after)
+            and (until is None or document["updatedAt"] < until)
+        )
+        return [dict(document) for document in heapq.nsmallest(limit, candidates, key=lambda d: (d["updatedAt"], d["_id"]))]
+
+    async def get_latest_watermark(self) -> Optional[Dict[str, Any]]:
+        if not self.documents:
+            return None
+        latest = max(self.documents.values(), key=lambda d: (d["updatedAt"], d["_id"]))
+        return {"updatedAt": latest["updatedAt"], "_id": latest["_id"]}
+
+    async def load_watermark(self, name: str = "outbound") -> Optional[Dict[str, Any]]:
+        watermark = self.watermarks.get(name)
+        return dict(watermark) if watermark else None
+
+    async def save_watermark(self, watermark: Dict[str, Any], name: str = "outbound") -> bool:
+        self.watermarks[name] = {"updatedAt": watermark["updatedAt"], "_id": watermark["_id"]}
+        return True
+
+    async def reset_watermark(self, name: str = "outbound"):
+        self.watermarks.pop(name, None)
+
+    async def save_workorder(self, workorder: Dict[str, Any]) -> str:
+        if workorder.get("updatedAt") is not None:
+            workorder = {**workorder, "sourceUpdatedAt": workorder["updatedAt"]}
+
+        existing_id = self.ids_by_number.get(workorder["number"])
+        if existing_id is None:
+            now = _now()
+            document = {**workorder, "_id": ObjectId(), "createdAt": now, "updatedAt": now, "isSynced": False}
+            self.documents[document["_id"]] = document
+            self.ids_by_number[document["number"]] = document["_id"]
+            return SAVE_CREATED
+
+        existing = self.documents[existing_id]
+        if self._is_stale(existing, workorder):
+            return SAVE_STALE
+
+        changes = self.compute_delta(existing, workorder)
+        if not changes:
+            return SAVE_UNCHANGED
+
+        existing.update(changes)
+        if self.changes_content(changes):
+            existing.update({"updatedAt": _now(), "isSynced": False})
+            for field in self.LEASE_FIELDS:
+                existing.pop(field, None)
+        return SAVE_UPDATED
+
+    async def mark_as_synced(self, workorder_id: str, owner_id: str = None, client_hash: str = None) -> bool:
+        document = self.documents.get(ObjectId(workorder_id))
+        if document is None:
+            return False
+        if owner_id is not None:
+            if document.get("leaseOwner") != owner_id:
+                return self._lease_lost(workorder_id)
+            for field in self.LEASE_FIELDS:
+                document.pop(field, None)
+        document.update({"isSynced": True, "syncedAt": _now()})
+        if client_hash is not None:
+            document["clientHash"] = client_hash
+        return True
+
+    async def record_client_hashes(self, client_hashes: Dict[str, str]) -> int:
+        recorded = 0
+        for workorder_id, client_hash in client_hashes.items():
+            document = self.documents.get(ObjectId(workorder_id))
+            if document is not None:
+                document["clientHash"] = client_hash
+                recorded += 1
+        return recorded
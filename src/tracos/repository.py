@@ -1,37 +1,66 @@
-from datetime import datetime, timezone
-from typing import Dict, List, Any
-from motor.motor_asyncio import AsyncIOMotorClient
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Any, Optional
 from loguru import logger
-from bson import ObjectId
 import asyncio
 
-from src.config import MONGO_URI, MONGO_DATABASE, MONGO_COLLECTION
+from src.config import MONGO_URI, MONGO_DATABASE, MONGO_COLLECTION, MONGO_STATE_COLLECTION, INBOUND_WRITE_MODE
+from src.tracos.base import (
+    SAVE_CREATED,
+    SAVE_FAILED,
+    SAVE_STALE,
+    SAVE_UNCHANGED,
+    SAVE_UPDATED,
+    TracOSStore,
+)
 
-class TracOSRepository:
+# motor, pymongo and bson are imported on first use: they dominate start-up time and are
+# not needed at all when another TracOS backend is selected
+AsyncIOMotorClient = None
+
+# MongoDB's error code for a write rejected by a unique index
+DUPLICATE_KEY_ERROR = 11000
+
+def _motor_client_class():
+    global AsyncIOMotorClient
+    if AsyncIOMotorClient is None:
+        from motor.motor_asyncio import AsyncIOMotorClient as client_class
+        AsyncIOMotorClient = client_class
+    return AsyncIOMotorClient
+
+class TracOSRepository(TracOSStore):
     """Repository for interacting with TracOS MongoDB database"""
 
-    def __init__(self, mongo_uri: str = MONGO_URI, db_name: str = MONGO_DATABASE, collection_name: str = MONGO_COLLECTION):
+    def __init__(self, mongo_uri: str = MONGO_URI, db_name: str = MONGO_DATABASE, collection_name: str = MONGO_COLLECTION, state_collection_name: str = MONGO_STATE_COLLECTION, write_mode: str = INBOUND_WRITE_MODE, client=None):
         self.mongo_uri = mongo_uri
         self.db_name = db_name
         self.collection_name = collection_name
-        self.client = None
+        self.state_collection_name = state_collection_name
+        self.write_mode = write_mode
+        # A client passed in is shared (e.g. by several tenants) and stays open on disconnect
+        self.client = client
+        self._owns_client = client is None
         self.db = None
         self.collection = None
+        self.state_collection = None
         self.retry_attempts = 3
         self.retry_delay = 2
 
     async def connect(self):
         """Establish connection to MongoDB"""
+        if not self._owns_client:
+            self._bind_collections()
+            await self.ensure_indexes()
+            return
+
         for attempt in range(self.retry_attempts):
             try:
                 logger.info(f"Connecting to MongoDB (attempt {attempt + 1}/{self.retry_attempts})...")
-                self.client = AsyncIOMotorClient(self.mongo_uri, serverSelectionTimeoutMS=5000)
+                self.client = _motor_client_class()(self.mongo_uri, serverSelectionTimeoutMS=5000)
                 await self.client.admin.command('ping')
 
-                self.db = self.client[self.db_name]
-                self.collection = self.db[self.collection_name]
+                self._bind_collections()
                 logger.info("Successfully connected to MongoDB")
-                return
+                break
             except Exception as e:
                 logger.error(f"Failed to connect to MongoDB on attempt {attempt + 1}: {e}")
                 if attempt < self.retry_attempts - 1:
@@ -39,53 +68,362 @@ class TracOSRepository:
                 else:
                     logger.error("Max retry attempts reached, could not connect to MongoDB")
                     raise ConnectionError("Could not connect to MongoDB after several attempts")
+        # Outside the retry loop: a missing required index is not a connection problem
+        await self.ensure_indexes()
+
+    def _bind_collections(self):
+        self.db = self.client[self.db_name]
+        self.collection = self.db[self.collection_name]
+        self.state_collection = self.db[self.state_collection_name]
+
+    async def ensure_indexes(self):
+        """Create the indexes backing the outbound selection queries.
+
+        Conditional upserts rely on the unique index on number to reject stale writes, so in
+        that mode failing to create it is an error instead of a warning.
+        """
+        try:
+            await self.collection.create_index("number", unique=True)
+        except Exception as e:
+            if self.write_mode == "conditional":
+                raise RuntimeError(f"INBOUND_WRITE_MODE=conditional needs a unique index on {self.collection_name}.number: {e}") from e
+            logger.warning(f"Could not ensure unique index on {self.collection_name}.number: {e}")
+        try:
+            await self.collection.create_index([("updatedAt", 1), ("_id", 1)])
+            await self.collection.create_index([("isSynced", 1), ("leaseExpiresAt", 1)])
+        except Exception as e:
+            logger.warning(f"Could not ensure indexes on {self.collection_name}: {e}")
 
     async def disconnect(self):
         """Close the MongoDB connection"""
-        if self.client:
+        if self.client and self._owns_client:
             self.client.close()
             logger.info("MongoDB connection closed")
 
-    async def get_unsynchronized_workorders(self) -> List[Dict[str, Any]]:
+    async def get_unsynchronized_workorders(self, limit: int = 100) -> List[Dict[str, Any]]:
         """Get all workorders that have not been synchronized yet"""
         try:
             cursor = self.collection.find({"isSynced": False})
-            return await cursor.to_list(length=100)
+            return await cursor.to_list(length=limit)
         except Exception as e:
             logger.error(f"Error retrieving unsynchronized workorders: {e}")
             return []
 
-    async def create_or_update_workorder(self, workorder: Dict[str, Any]) -> bool:
-        """Create a new workorder or update an existing one, with retry logic."""
-        for attempt in range(self.retry_attempts):
-            try:
-                existing = await self.collection.find_one({"number": workorder["number"]})
+    async def claim_unsynchronized_workorders(self, owner_id: str, batch_size: int = 100, lease_seconds: int = 300) -> List[Dict[str, Any]]:
+        """Lease a batch of unsynchronized workorders to owner_id.
+
+        A workorder is claimable when it is not synced and has no lease or an expired one.
+        The claim itself is a single conditional update, so when several instances race for
+        the same document only one of them gets it; the others simply claim fewer rows.
+        """
+        try:
+            now = datetime.now(timezone.utc)
+            claimable = {
+                "isSynced": False,
+                "$or": [{"leaseExpiresAt": None}, {"leaseExpiresAt": {"$lt": now}}],
+            }
+            candidates = await self.collection.find(claimable, {"_id": 1}).to_list(length=batch_size)
+            if not candidates:
+                return []
+
+            from bson import ObjectId
+            lease_token = str(ObjectId())
+            await self.collection.update_many(
+                {**claimable, "_id": {"$in": [doc["_id"] for doc in candidates]}},
+                {
+                    "$set": {
+                        "leaseOwner": owner_id,
+                        "leaseToken": lease_token,
+                        "leaseExpiresAt": now + timedelta(seconds=lease_seconds),
+                    }
+                }
+            )
+            cursor = self.collection.find({"leaseToken": lease_token})
+            return await cursor.to_list(length=batch_size)
+        except Exception as e:
+            logger.error(f"Error claiming unsynchronized workorders for {owner_id}: {e}")
+            return []
+
+    async def get_workorders_after(self, watermark: Optional[Dict[str, Any]], limit: int = 100, until: datetime = None) -> List[Dict[str, Any]]:
+        """Get workorders changed after the (updatedAt, _id) watermark, oldest first.
+
+        Ordering on the compound key makes the scan resumable even when many workorders
+        share the same updatedAt, and it is served by the (updatedAt, _id) index. When
+        given, until leaves out workorders with updatedAt at or after it.
+        """
+        try:
+            query = {}
+            if watermark:
+                query = {
+                    "$or": [
+                        {"updatedAt": {"$gt": watermark["updatedAt"]}},
+                        {"updatedAt": watermark["updatedAt"], "_id": {"$gt": watermark["_id"]}},
+                    ]
+                }
+            if until is not None:
+                query["updatedAt"] = {"$lt": until}
+            cursor = self.collection.find(query, sort=[("updatedAt", 1), ("_id", 1)], limit=limit)
+            return await cursor.to_list(length=limit)
+        except Exception as e:
+            logger.error(f"Error retrieving workorders after watermark: {e}")
+            return []
+
+    async def get_latest_watermark(self) -> Optional[Dict[str, Any]]:
+        """Return the (updatedAt, _id) of the most recently changed workorder"""
+        cursor = self.collection.find({}, {"updatedAt": 1}, sort=[("updatedAt", -1), ("_id", -1)], limit=1)
+        latest = await cursor.to_list(length=1)
+        if not latest:
+            return None
+        return {"updatedAt": latest[0]["updatedAt"], "_id": latest[0]["_id"]}
+
+    async def load_watermark(self, name: str = "outbound") -> Optional[Dict[str, Any]]:
+        """Load a persisted watermark, or None when the scan should start from the beginning"""
+        state = await self.state_collection.find_one({"_id": self._watermark_id(name)})
+        if not state:
+            return None
+        return {"updatedAt": state["updatedAt"], "_id": state["workorderId"]}
+
+    async def save_watermark(self, watermark: Dict[str, Any], name: str = "outbound") -> bool:
+        """Persist a watermark"""
+        try:
+            await self.state_collection.update_one(
+                {"_id": self._watermark_id(name)},
+                {"$set": {"updatedAt": watermark["updatedAt"], "workorderId": watermark["_id"], "savedAt": datetime.now(timezone.utc)}},
+                upsert=True
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Error saving {name} watermark: {e}")
+            return False
 
-                if existing and self.compare_items(existing, workorder):
-                    logger.info(f"Workorder {workorder['number']} is already up-to-date, skipping")
-                    return True
+    async def reset_watermark(self, name: str = "outbound"):
+        """Drop a watermark so the next scan starts from the beginning"""
+        await self.state_collection.delete_one({"_id": self._watermark_id(name)})
 
-                if existing:
-                    return await self.update_existing_workorder(workorder)
+    def _watermark_id(self, name: str) -> str:
+        # Keyed by collection: tenants sharing a database (and state collection) keep their own marks
+        return f"watermark:{self.collection_name}:{name}"
 
-                return await self.create_new_workorder(workorder)
+    async def save_workorder(self, workorder: Dict[str, Any]) -> str:
+        """Create or update a workorder, returning one of the SAVE_* outcomes.
+
+        The client's lastUpdateDate (mapped to updatedAt) is kept as sourceUpdatedAt, and a
+        write carrying an older one than the stored document is rejected as stale.
+        """
+        if workorder.get("updatedAt") is not None:
+            workorder = {**workorder, "sourceUpdatedAt": workorder["updatedAt"]}
+
+        for attempt in range(self.retry_attempts):
+            try:
+                if self.write_mode == "conditional":
+                    return await self.conditional_upsert_workorder(workorder)
+                return await self._save_delta(workorder)
             except Exception as e:
                 logger.error(f"Attempt {attempt + 1}/{self.retry_attempts} failed for workorder {workorder.get('number')}: {e}")
                 if attempt < self.retry_attempts - 1:
                     await asyncio.sleep(self.retry_delay)
                 else:
                     logger.error(f"Max retries reached for workorder {workorder.get('number')}. Giving up.")
-                    return False
-        return False
-
-    async def update_existing_workorder(self, workorder: Dict[str, Any]) -> bool:
-        update_data = {**workorder, "updatedAt": datetime.now(timezone.utc), "isSynced": False}
-        result = await self.collection.update_one(
-            {"number": workorder["number"]},
-            {"$set": update_data}
-        )
+                    return SAVE_FAILED
+        return SAVE_FAILED
+
+    async def _save_delta(self, workorder: Dict[str, Any]) -> str:
+        """Read the stored workorder, then create it, reject it as stale or write only its delta"""
+        existing = await self.collection.find_one({"number": workorder["number"]})
+
+        if not existing:
+            return SAVE_CREATED if await self.create_new_workorder(workorder) else SAVE_FAILED
+
+        if self._is_stale(existing, workorder):
+            logger.info(f"Workorder {workorder['number']} is older than the stored version, skipping")
+            return SAVE_STALE
+
+        changes = self.compute_delta(existing, workorder)
+        if not changes:
+            logger.info(f"Workorder {workorder['number']} is already up-to-date, skipping")
+            return SAVE_UNCHANGED
+
+        return await self.update_existing_workorder(workorder, changes)
+
+    async def save_workorders(self, workorders: List[Dict[str, Any]]) -> List[str]:
+        """Save a batch of workorders in one unordered bulk_write.
+
+        In delta mode, outcomes are decided from a single find over the batch's numbers, as
+        save_workorder does per document, and writes that lose a race with a concurrent writer
+        (a duplicate insert, or a guarded update that no longer matches) are retried one by one.
+        In conditional mode the batch is upserted without reading it first.
+        """
+        if len(workorders) <= 1:
+            return [await self.save_workorder(workorder) for workorder in workorders]
+        from pymongo import InsertOne, UpdateOne
+        from pymongo.errors import BulkWriteError
+
+        workorders = [
+            {**workorder, "sourceUpdatedAt": workorder["updatedAt"]} if workorder.get("updatedAt") is not None else workorder
+            for workorder in workorders
+        ]
+        if self.write_mode == "conditional":
+            return await self._conditional_upsert_workorders(workorders)
+        try:
+            cursor = self.collection.find({"number": {"$in": [workorder["number"] for workorder in workorders]}})
+            existing_by_number = {doc["number"]: doc for doc in await cursor.to_list(length=None)}
+        except Exception as e:
+            logger.error(f"Bulk read failed, saving {len(workorders)} workorders one by one: {e}")
+            return [await self.save_workorder(workorder) for workorder in workorders]
+
+        outcomes: List[str] = []
+        operations, op_indexes = [], []
+        for index, workorder in enumerate(workorders):
+            existing = existing_by_number.get(workorder["number"])
+            if existing is None:
+                now = datetime.now(timezone.utc)
+                operations.append(InsertOne({**workorder, "createdAt": now, "updatedAt": now, "isSynced": False}))
+                outcomes.append(SAVE_CREATED)
+            elif self._is_stale(existing, workorder):
+                outcomes.append(SAVE_STALE)
+                continue
+            else:
+                changes = self.compute_delta(existing, workorder)
+                if not changes:
+                    outcomes.append(SAVE_UNCHANGED)
+                    continue
+                query, update = self._guarded_update(workorder, changes)
+                operations.append(UpdateOne(query, update))
+                outcomes.append(SAVE_UPDATED)
+            op_indexes.append(index)
+
+        if not operations:
+            return outcomes
+
+        update_indexes = [index for index in op_indexes if outcomes[index] == SAVE_UPDATED]
+        retry = set()
+        try:
+            result = await self.collection.bulk_write(operations, ordered=False)
+            matched = result.matched_count
+        except BulkWriteError as e:
+            retry = {op_indexes[error["index"]] for error in e.details.get("writeErrors", [])}
+            matched = e.details.get("nMatched", 0)
+        except Exception as e:
+            logger.error(f"Bulk write of {len(operations)} workorders failed, retrying one by one: {e}")
+            retry, matched = set(op_indexes), len(update_indexes)
+        if matched < len(update_indexes):
+            # Some guarded update lost a race with a newer version; the individual save tells which
+            retry.update(update_indexes)
+
+        for index in sorted(retry):
+            outcome = await self.save_workorder(workorders[index])
+            # A guarded update already applied by the bulk write now reads as unchanged
+            if not (outcome == SAVE_UNCHANGED and outcomes[index] == SAVE_UPDATED):
+                outcomes[index] = outcome
+
+        logger.info(f"Saved {len(workorders)} workorders in bulk ({len(operations)} writes, {len(retry)} retried)")
+        return outcomes
+
+    async def conditional_upsert_workorder(self, workorder: Dict[str, Any]) -> str:
+        """Upsert in a single round-trip, letting MongoDB reject stale writes.
+
+        The filter only matches a stored document older than the incoming sourceUpdatedAt.
+        When a newer (or the same) version is stored, the upsert tries to insert a second
+        document and the unique index on number rejects it with a DuplicateKeyError. That
+        case is settled by the delta path, so an equal sourceUpdatedAt gives the same outcome
+        as in delta mode: unchanged for the same content, an update for different content.
+        """
+        from pymongo.errors import DuplicateKeyError
+
+        query, update = self._conditional_upsert(workorder)
+        try:
+            result = await self.collection.update_one(query, update, upsert=True)
+        except DuplicateKeyError:
+            return await self._save_delta(workorder)
+
+        if result.upserted_id is not None:
+            logger.info(f"Created workorder {workorder['number']}")
+            return SAVE_CREATED
         logger.info(f"Updated workorder {workorder['number']}")
-        return result.modified_count > 0
+        return SAVE_UPDATED
+
+    async def _conditional_upsert_workorders(self, workorders: List[Dict[str, Any]]) -> List[str]:
+        """Upsert a batch with one unordered bulk_write of guarded upserts and no read before it.
+
+        Duplicate-key errors (a newer or the same version is stored) are settled through the
+        delta path, as conditional_upsert_workorder does; any other failed write is retried
+        one by one.
+        """
+        from pymongo import UpdateOne
+        from pymongo.errors import BulkWriteError
+
+        operations = [UpdateOne(*self._conditional_upsert(workorder), upsert=True) for workorder in workorders]
+        outcomes = [SAVE_UPDATED] * len(workorders)
+        settle, retry = set(), set()
+        try:
+            result = await self.collection.bulk_write(operations, ordered=False)
+            upserted = result.upserted_ids
+        except BulkWriteError as e:
+            upserted = {entry["index"]: entry["_id"] for entry in e.details.get("upserted", [])}
+            for error in e.details.get("writeErrors", []):
+                (settle if error.get("code") == DUPLICATE_KEY_ERROR else retry).add(error["index"])
+        except Exception as e:
+            logger.error(f"Bulk upsert of {len(workorders)} workorders failed, retrying one by one: {e}")
+            upserted, retry = {}, set(range(len(workorders)))
+
+        for index in upserted:
+            outcomes[index] = SAVE_CREATED
+        for index in sorted(settle):
+            try:
+                outcomes[index] = await self._save_delta(workorders[index])
+            except Exception as e:
+                logger.error(f"Failed to settle workorder {workorders[index].get('number')} after a duplicate key: {e}")
+                retry.add(index)
+        for index in sorted(retry):
+            outcomes[index] = await self.save_workorder(workorders[index])
+
+        logger.info(f"Upserted {len(workorders)} workorders in bulk ({len(settle)} settled, {len(retry)} retried)")
+        return outcomes
+
+    def _conditional_upsert(self, workorder: Dict[str, Any]):
+        """Build the (filter, update) of an upsert that only replaces an older stored version"""
+        now = datetime.now(timezone.utc)
+        fields = {k: v for k, v in workorder.items() if k not in self.MANAGED_FIELDS}
+        query = {"number": workorder["number"]}
+        if workorder.get("sourceUpdatedAt") is not None:
+            query["$or"] = [
+                {"sourceUpdatedAt": {"$lt": workorder["sourceUpdatedAt"]}},
+                {"sourceUpdatedAt": None},
+            ]
+        update = {
+            "$set": {**fields, "updatedAt": now, "isSynced": False},
+            "$setOnInsert": {"createdAt": now},
+            "$unset": self.LEASE_FIELDS,
+        }
+        return query, update
+
+    def _guarded_update(self, workorder: Dict[str, Any], changes: Dict[str, Any]):
+        """Build the (filter, update) applying a delta unless a newer version was stored meanwhile"""
+        update = {"$set": dict(changes)}
+        if self.changes_content(changes):
+            update["$set"].update({"updatedAt": datetime.now(timezone.utc), "isSynced": False})
+            # Dropping the lease makes an in-flight export of the previous version fail to mark
+            # the workorder as synced, so the new version is exported on the next claim
+            update["$unset"] = self.LEASE_FIELDS
+
+        query = {"number": workorder["number"]}
+        if workorder.get("sourceUpdatedAt") is not None:
+            # Guards against a newer version landing between our read and this write
+            query["$or"] = [
+                {"sourceUpdatedAt": {"$lte": workorder["sourceUpdatedAt"]}},
+                {"sourceUpdatedAt": None},
+            ]
+        return query, update
+
+    async def update_existing_workorder(self, workorder: Dict[str, Any], changes: Dict[str, Any]) -> str:
+        """Apply only the changed fields; updatedAt/isSynced move only when content changed"""
+        query, update = self._guarded_update(workorder, changes)
+        result = await self.collection.update_one(query, update)
+        if result.matched_count == 0:
+            logger.info(f"Workorder {workorder['number']} changed concurrently with a newer version, skipping")
+            return SAVE_STALE
+        logger.info(f"Updated workorder {workorder['number']} ({', '.join(sorted(changes))})")
+        return SAVE_UPDATED
 
     async def create_new_workorder(self, workorder: Dict[str, Any]) -> bool:
         workorder["createdAt"] = datetime.now(timezone.utc)
@@ -95,26 +433,59 @@ class TracOSRepository:
         logger.info(f"Created workorder {workorder['number']}")
         return bool(result.inserted_id)
 
-    async def mark_as_synced(self, workorder_id: str) -> bool:
-        """Mark a workorder as synchronized"""
+    async def record_client_hashes(self, client_hashes: Dict[str, str]) -> int:
+        """Store the fingerprint of what the client now holds for several workorders in one bulk write"""
+        from bson import ObjectId
+        from pymongo import UpdateOne
+        if not client_hashes:
+            return 0
+        result = await self.collection.bulk_write(
+            [UpdateOne({"_id": ObjectId(workorder_id)}, {"$set": {"clientHash": client_hash}}) for workorder_id, client_hash in client_hashes.items()],
+            ordered=False,
+        )
+        return result.matched_count
+
+    async def mark_as_synced(self, workorder_id: str, owner_id: str = None, client_hash: str = None) -> bool:
+        """Mark a workorder as synchronized, releasing the lease held by owner_id if given.
+
+        client_hash records the fingerprint of the version the client now holds, so later
+        cycles can tell whether there is anything new to export.
+        """
+        from bson import ObjectId
         try:
-            result = await self.collection.update_one(
-                {"_id": ObjectId(workorder_id)},
-                {
-                    "$set": {
-                        "isSynced": True,
-                        "syncedAt": datetime.now(timezone.utc)
-                    }
+            query = {"_id": ObjectId(workorder_id)}
+            update = {
+                "$set": {
+                    "isSynced": True,
+                    "syncedAt": datetime.now(timezone.utc)
                 }
-            )
+            }
+            if client_hash is not None:
+                update["$set"]["clientHash"] = client_hash
+            if owner_id is not None:
+                # Only the current lease holder may complete the export
+                query["leaseOwner"] = owner_id
+                update["$unset"] = self.LEASE_FIELDS
+
+            result = await self.collection.update_one(query, update)
+            if owner_id is not None and result.modified_count == 0:
+                return self._lease_lost(workorder_id)
             return result.modified_count > 0
         except Exception as e:
             logger.error(f"Error marking workorder {workorder_id} as synced: {e}")
             return False
 
-    def compare_items(self, inbound, outbound) -> bool:
-        """Compare two workorder items for equality"""
-        keys = ["description", "status", "title", "deleted"]
-        filtered_inbound = {k: v for k, v in inbound.items() if k in keys}
-        filtered_outbound = {k: v for k, v in outbound.items() if k in keys}
-        return filtered_inbound == filtered_outbound
+    async def mark_many_as_synced(self, workorder_ids: List[str], owner_id: str = None) -> int:
+        """Mark several workorders as synchronized in one round-trip"""
+        if owner_id is not None:
+            return await super().mark_many_as_synced(workorder_ids, owner_id=owner_id)
+        from bson import ObjectId
+        try:
+            result = await self.collection.update_many(
+                {"_id": {"$in": [ObjectId(workorder_id) for workorder_id in workorder_ids]}},
+                {"$set": {"isSynced": True, "syncedAt": datetime.now(timezone.utc)}}
+            )
+            return result.modified_count
+        except Exception as e:
+            logger.error(f"Error marking {len(workorder_ids)} workorders as synced: {e}")
+            return 0
@@ -0,0 +1,224 @@
+import asyncio
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId, json_util
+from loguru import logger
+
+from src.tracos.base import (
+    SAVE_CREATED,
+    SAVE_STALE,
+    SAVE_UNCHANGED,
+    SAVE_UPDATED,
+    TracOSStore,
+    _now,
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS workorders (
+    id TEXT PRIMARY KEY,
+    number INTEGER NOT NULL UNIQUE,
+    is_synced INTEGER NOT NULL,
+    updated_at TEXT NOT NULL,
+    lease_expires_at TEXT,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS workorders_updated_at ON workorders (updated_at, id);
+CREATE INDEX IF NOT EXISTS workorders_is_synced ON workorders (is_synced, lease_expires_at);
+CREATE TABLE IF NOT EXISTS sync_state (
+    name TEXT PRIMARY KEY,
+    updated_at TEXT NOT NULL,
+    workorder_id TEXT NOT NULL
+);
+"""
+
+def _sort_key(value: datetime) -> str:
+    """Fixed-width UTC text, so SQLite orders timestamps correctly"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.strftime("%Y-%m-%dT%H:%M:%S.%f")
+
+class SQLiteTracOSRepository(TracOSStore):
+    """TracOS store backed by a local SQLite file, for benchmarks and load tests without MongoDB.
+
+    Documents are stored as MongoDB extended JSON, next to the columns the queries filter
+    and sort on. All SQLite calls run in a worker thread, one at a time.
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self.connection = None
+        self._lock = asyncio.Lock()
+
+    async def _run(self, operation, *args):
+        async with self._lock:
+            return await asyncio.to_thread(operation, *args)
+
+    async def connect(self):
+        def _connect():
+            self.connection = sqlite3.connect(self.path, check_same_thread=False)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.executescript(SCHEMA)
+        await self._run(_connect)
+        logger.info(f"Using SQLite TracOS store at {self.path}")
+
+    async def disconnect(self):
+        if self.connection is not None:
+            await self._run(self.connection.close)
+            self.connection = None
+
+    def _select(self, where: str, params=(), order: str = "rowid", limit: int = None) -> List[Dict[str, Any]]:
+        sql = f"SELECT doc FROM workorders WHERE {where} ORDER BY {order}"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return [json_util.loads(row[0]) for row in self.connection.execute(sql, params)]
+
+    def _write(self, document: Dict[str, Any]):
+        self.connection.execute(
+            "INSERT OR REPLACE INTO workorders (id, number, is_synced, updated_at, lease_expires_at, doc) VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                str(document["_id"]),
+                document["number"],
+                int(bool(document.get("isSynced"))),
+                _sort_key(document["updatedAt"]),
+                _sort_key(document["leaseExpiresAt"]) if document.get("leaseExpiresAt") else None,
+                json_util.dumps(document),
+            ),
+        )
+
+    async def get_unsynchronized_workorders(self, limit: int = 100) -> List[Dict[str, Any]]:
+        return await self._run(self._select, "is_synced = 0", (), "rowid", limit)
+
+    async def claim_unsynchronized_workorders(self, owner_id: str, batch_size: int = 100, lease_seconds: int = 300) -> List[Dict[str, Any]]:
+        def _claim():
+            now = _now()
+            lease = {"leaseOwner": owner_id, "leaseToken": str(ObjectId()), "leaseExpiresAt": now + timedelta(seconds=lease_seconds)}
+            with self.connection:
+                claimed = self._select("is_synced = 0 AND (lease_expires_at IS NULL OR lease_expires_at < ?)", (_sort_key(now),), "rowid", batch_size)
+                for document in claimed:
+                    document.update(lease)
+                    self._write(document)
+            return claimed
+        return await self._run(_claim)
+
+    async def get_workorders_after(self, watermark: Optional[Dict[str, Any]], limit: int = 100, until: datetime = None) -> List[Dict[str, Any]]:
+        where, params = "1 = 1", ()
+        if watermark is not None:
+            updated_at, workorder_id = _sort_key(watermark["updatedAt"]), str(watermark["_id"])
+            where, params = "(updated_at > ? OR (updated_at = ? AND id > ?))", (updated_at, updated_at, workorder_id)
+        if until is not None:
+            where, params = f"{where} AND updated_at < ?", (*params, _sort_key(until))
+        return await self._run(self._select, where, params, "updated_at, id", limit)
+
+    async def get_latest_watermark(self) -> Optional[Dict[str, Any]]:
+        latest = await self._run(self._select, "1 = 1", (), "updated_at DESC, id DESC", 1)
+        if not latest:
+            return None
+        return {"updatedAt": latest[0]["updatedAt"], "_id": latest[0]["_id"]}
+
+    async def load_watermark(self, name: str = "outbound") -> Optional[Dict[str, Any]]:
+        def _load():
+            return self.connection.execute("SELECT updated_at, workorder_id FROM sync_state WHERE name = ?", (name,)).fetchone()
+        row = await self._run(_load)
+        if row is None:
+            return None
+        return {"updatedAt": datetime.fromisoformat(row[0]), "_id": ObjectId(row[1])}
+
+    async def save_watermark(self, watermark: Dict[str, Any], name: str = "outbound") -> bool:
+        def _save():
+            with self.connection:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO sync_state (name, updated_at, workorder_id) VALUES (?, ?, ?)",
+                    (name, _sort_key(watermark["updatedAt"]), str(watermark["_id"])),
+                )
+        await self._run(_save)
+        return True
+
+    async def reset_watermark(self, name: str = "outbound"):
+        def _reset():
+            with self.connection:
+                self.connection.execute("DELETE FROM sync_state WHERE name = ?", (name,))
+        await self._run(_reset)
+
+    def _save_one(self, workorder: Dict[str, Any]) -> str:
+        if workorder.get("updatedAt") is not None:
+            workorder = {**workorder, "sourceUpdatedAt": workorder["updatedAt"]}
+
+        existing = self._select("number = ?", (workorder["number"],), "rowid", 1)
+        if not existing:
+            now = _now()
+            self._write({**workorder, "_id": ObjectId(), "createdAt": now, "updatedAt": now, "isSynced": False})
+            return SAVE_CREATED
+
+        document = existing[0]
+        if self._is_stale(document, workorder):
+            return SAVE_STALE
+
+        changes = self.compute_delta(document, workorder)
+        if not changes:
+            return SAVE_UNCHANGED
+
+        document.update(changes)
+        if self.changes_content(changes):
+            document.update({"updatedAt": _now(), "isSynced": False})
+            for field in self.LEASE_FIELDS:
+                document.pop(field, None)
+        self._write(document)
+        return SAVE_UPDATED
+
+    async def save_workorder(self, workorder: Dict[str, Any]) -> str:
+        def _save():
+            with self.connection:
+                return self._save_one(workorder)
+        return await self._run(_save)
+
+    async def save_workorders(self, workorders: List[Dict[str, Any]]) -> List[str]:
+        """Save several workorders in a single transaction"""
+        def _save_all():
+            with self.connection:
+                return [self._save_one(workorder) for workorder in workorders]
+        return await self._run(_save_all)
+
+    def _mark_one(self, workorder_id: str, owner_id: str = None, client_hash: str = None) -> bool:
+        existing = self._select("id = ?", (str(workorder_id),), "rowid", 1)
+        if not existing:
+            return False
+        document = existing[0]
+        if owner_id is not None:
+            if document.get("leaseOwner") != owner_id:
+                return self._lease_lost(workorder_id)
+            for field in self.LEASE_FIELDS:
+                document.pop(field, None)
+        document.update({"isSynced": True, "syncedAt": _now()})
+        if client_hash is not None:
+            document["clientHash"] = client_hash
+        self._write(document)
+        return True
+
+    async def mark_as_synced(self, workorder_id: str, owner_id: str = None, client_hash: str = None) -> bool:
+        def _mark():
+            with self.connection:
+                return self._mark_one(workorder_id, owner_id, client_hash)
+        return await self._run(_mark)
+
+    async def mark_many_as_synced(self, workorder_ids: List[str], owner_id: str = None) -> int:
+        """Mark several workorders as synchronized in a single transaction"""
+        def _mark_all():
+            with self.connection:
+                return sum(self._mark_one(workorder_id, owner_id) for workorder_id in workorder_ids)
+        return await self._run(_mark_all)
+
+    async def record_client_hashes(self, client_hashes: Dict[str, str]) -> int:
+        """Store several client hashes in a single transaction"""
+        def _record_all():
+            recorded = 0
+            with self.connection:
+                for workorder_id, client_hash in client_hashes.items():
+                    existing = self._select("id = ?", (str(workorder_id),), "rowid", 1)
+                    if existing:
+                        self._write({**existing[0], "clientHash": client_hash})
+                        recorded += 1
+            return recorded
+        return await self._run(_record_all)
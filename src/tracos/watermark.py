@@ -0,0 +1,57 @@
+"""Rebuild or reset the outbound watermark used by OUTBOUND_SYNC_MODE=watermark
+
+Usage:
+    python -m src.tracos.watermark --backfill        # re-export every workorder on the next cycle
+    python -m src.tracos.watermark --since <ISO8601> # re-export workorders changed after a date
+    python -m src.tracos.watermark --latest          # skip the current backlog entirely
+"""
+import argparse
+import asyncio
+from datetime import datetime
+
+from bson import ObjectId
+from loguru import logger
+
+from src.tracos.base import TracOSStore
+from src.tracos.factory import create_tracos_repository
+
+# Smallest possible ObjectId, so a watermark at a date includes every workorder after it
+MIN_OBJECT_ID = ObjectId("0" * 24)
+
+
+async def rebuild_watermark(repo: TracOSStore, since: datetime = None, latest: bool = False):
+    """Move the outbound watermark to the beginning, to a date, or to the newest workorder"""
+    if latest:
+        watermark = await repo.get_latest_watermark()
+        if watermark is None:
+            await repo.reset_watermark()
+            logger.info("Collection is empty, watermark reset")
+            return
+        await repo.save_watermark(watermark)
+        logger.info(f"Watermark moved to latest workorder ({watermark['updatedAt']}, {watermark['_id']})")
+    elif since is not None:
+        await repo.save_watermark({"updatedAt": since, "_id": MIN_OBJECT_ID})
+        logger.info(f"Watermark moved to {since.isoformat()}")
+    else:
+        await repo.reset_watermark()
+        logger.info("Watermark reset, next outbound cycle backfills every workorder")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Rebuild the outbound sync watermark")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--backfill", action="store_true", help="export every workorder again")
+    group.add_argument("--since", type=datetime.fromisoformat, help="export workorders updated after this ISO 8601 date")
+    group.add_argument("--latest", action="store_true", help="skip all workorders currently stored")
+    args = parser.parse_args()
+
+    repo = create_tracos_repository()
+    await repo.connect()
+    try:
+        await rebuild_watermark(repo, since=args.since, latest=args.latest)
+    finally:
+        await repo.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,6 +1,10 @@
 from datetime import datetime, timezone
 from typing import Dict, Any
-import iso8601
+import hashlib
+import json
+
+# TracOS fields that are visible to the client once exported
+CLIENT_VISIBLE_FIELDS = ("number", "title", "description", "status", "deleted")
 
 class WorkorderMapper:
     """Mapper for translating between TracOS and client workorder formats"""
@@ -71,12 +75,27 @@ class WorkorderMapper:
 
         return client_workorder
 
+    @staticmethod
+    def fingerprint(tracos_workorder: Dict[str, Any]) -> str:
+        """Hash the client-visible content of a TracOS workorder"""
+        content = [tracos_workorder.get(field) for field in CLIENT_VISIBLE_FIELDS]
+        return hashlib.sha1(json.dumps(content, default=str).encode()).hexdigest()
+
     @staticmethod
     def _parse_iso_date(date_str: str) -> datetime:
         """Parse ISO 8601 date string to datetime"""
-        if not date_str:
+        if not date_str or date_str == "None":
             return datetime.now(timezone.utc)
 
+        try:
+            # The stdlib parser covers the formats clients send and is much faster
+            parsed = datetime.fromisoformat(date_str)
+            return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+        except ValueError:
+            pass
+
+        # iso8601 accepts a few more variants; it is only imported if ever needed
+        import iso8601
         try:
             return iso8601.parse_date(date_str)
         except (ValueError, iso8601.ParseError):
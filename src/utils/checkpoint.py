@@ -0,0 +1,85 @@
+import json
+import os
+from typing import Any, Dict, Iterable, List, Optional
+
+from loguru import logger
+
+class CheckpointStore:
+    """A small JSON document kept on disk and replaced atomically on every save"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.data: Dict[str, Any] = self._load()
+
+    def _load(self) -> Dict[str, Any]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            # Losing a checkpoint only costs redoing work, never correctness
+            logger.warning(f"Ignoring unreadable checkpoint {self.path}: {e}")
+            return {}
+
+    def save(self):
+        """Write to a temp file and rename it over the checkpoint, so a crash never leaves half a file"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+class SyncCheckpoint:
+    """Progress that lets an interrupted run resume instead of starting over.
+
+    Inbound: the files already persisted, with the (mtime, size) they had when read.
+    Outbound: workorders written to the client but not yet marked synced (or covered by the watermark).
+    The two are kept in separate files because outbound progress is saved on every outbound cycle.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._inbound = CheckpointStore(os.path.join(directory, "inbound.json"))
+        self._outbound = CheckpointStore(os.path.join(directory, "outbound.json"))
+
+    @staticmethod
+    def file_fingerprint(path: str) -> List[int]:
+        stat = os.stat(path)
+        return [stat.st_mtime_ns, stat.st_size]
+
+    def inbound_file_done(self, file_name: str, fingerprint: List[int]) -> bool:
+        """True if the file was persisted and has not changed since"""
+        return self._inbound.data.get(file_name) == fingerprint
+
+    def mark_inbound_files(self, fingerprints: Dict[str, List[int]], existing: Optional[Iterable[str]] = None):
+        """Record persisted files; when the full listing is given, forget files that are gone"""
+        if existing is not None:
+            existing = set(existing)
+            for file_name in [name for name in self._inbound.data if name not in existing]:
+                del self._inbound.data[file_name]
+        self._inbound.data.update(fingerprints)
+        self._inbound.save()
+
+    def pending_export(self, workorder_id: str) -> Optional[Dict[str, Any]]:
+        return self._outbound.data.get(workorder_id)
+
+    def pending_exports(self) -> Dict[str, Dict[str, Any]]:
+        return dict(self._outbound.data)
+
+    def record_exports(self, client_hashes: Dict[str, str], owner_id: Optional[str] = None):
+        """Remember workorders (id -> client hash) written to the client before they are marked synced"""
+        for workorder_id, client_hash in client_hashes.items():
+            self._outbound.data[workorder_id] = {"clientHash": client_hash, "ownerId": owner_id}
+        self._outbound.save()
+
+    def clear_exports(self, workorder_ids: Iterable[str]):
+        removed = False
+        for workorder_id in workorder_ids:
+            removed = self._outbound.data.pop(workorder_id, None) is not None or removed
+        if removed:
+            self._outbound.save()
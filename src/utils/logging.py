@@ -2,6 +2,13 @@ import sys
 import os
 from loguru import logger
 
+LOG_FORMAT = "{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {message}"
+TENANT_LOG_FORMAT = "{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | [{extra[tenant]}] {message}"
+
+def _format_record(record) -> str:
+    """Prefix lines logged on behalf of a tenant (multi-tenant mode) with its name"""
+    return (TENANT_LOG_FORMAT if "tenant" in record["extra"] else LOG_FORMAT) + "\n{exception}"
+
 def setup_logging():
     """Configure application logging"""
 
@@ -10,7 +17,7 @@ def setup_logging():
 
     logger.add(
         sys.stdout,
-        format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {message}",
+        format=_format_record,
         level="INFO",
     )
 
@@ -20,7 +27,7 @@ def setup_logging():
 
     logger.add(
         os.path.join(log_dir, "errors.log"),
-        format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {message}",
+        format=_format_record,
         level="ERROR",
         rotation="10 MB",
         retention="1 week",
@@ -0,0 +1,26 @@
+from collections import Counter
+from typing import Dict
+
+class SyncMetrics:
+    """Counters describing the work done by the integration flow"""
+
+    def __init__(self):
+        self.counters = Counter()
+
+    def increment(self, name: str, amount: int = 1):
+        self.counters[name] += amount
+
+    def get(self, name: str) -> int:
+        return self.counters[name]
+
+    def ratio(self, numerator: str, denominator: str) -> float:
+        """Return numerator/denominator, or 0.0 when the denominator is zero"""
+        if not self.counters[denominator]:
+            return 0.0
+        return self.counters[numerator] / self.counters[denominator]
+
+    def snapshot(self) -> Dict[str, int]:
+        return dict(self.counters)
+
+    def reset(self):
+        self.counters.clear()
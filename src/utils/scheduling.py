@@ -0,0 +1,39 @@
+import time
+from typing import Optional
+
+class AdaptiveSchedule:
+    """Decides how long a flow waits before its next cycle.
+
+    A cycle that left a backlog runs again immediately; a cycle that did some work waits
+    the base interval; consecutive idle cycles stretch the wait by backoff_factor up to
+    max_interval, and the first busy cycle snaps it back to the base interval.
+    """
+
+    def __init__(self, base_interval: float, max_interval: float = None, backoff_factor: float = 2.0):
+        self.base_interval = base_interval
+        self.max_interval = max(max_interval or base_interval, base_interval)
+        self.backoff_factor = backoff_factor
+        self.idle_interval = None
+
+    def next_delay(self, processed: int, has_backlog: bool) -> float:
+        if has_backlog:
+            self.idle_interval = None
+            return 0.0
+        if processed:
+            self.idle_interval = None
+            return self.base_interval
+        if self.idle_interval is None:
+            self.idle_interval = self.base_interval
+        else:
+            self.idle_interval = min(self.idle_interval * self.backoff_factor, self.max_interval)
+        return self.idle_interval
+
+
+class TimeBudget:
+    """Deadline for a single cycle; a budget of 0 or None never expires"""
+
+    def __init__(self, seconds: Optional[float]):
+        self.deadline = time.monotonic() + seconds if seconds else None
+
+    def expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() >= self.deadline
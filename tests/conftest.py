@@ -0,0 +1,36 @@
+"""Fixtures shared by the unit test modules"""
+from datetime import datetime, timezone
+
+import pytest
+
+
+@pytest.fixture
+def client_workorder():
+    """A valid inbound client workorder"""
+    return {
+        "orderNo": 7,
+        "summary": "Replace bearing",
+        "creationDate": "2025-05-30T10:00:00+00:00",
+        "lastUpdateDate": "2025-05-30T11:00:00+00:00",
+        "isDone": False,
+        "isCanceled": False,
+        "isDeleted": False,
+        "isOnHold": False,
+        "isPending": True,
+    }
+
+
+@pytest.fixture
+def tracos_workorder():
+    """Factory for TracOS workorders as the stores receive them; hour sets updatedAt"""
+    def make(number, title="Title", hour=10):
+        return {
+            "number": number,
+            "title": title,
+            "description": "",
+            "status": "pending",
+            "deleted": False,
+            "createdAt": datetime(2025, 5, 30, 9, tzinfo=timezone.utc),
+            "updatedAt": datetime(2025, 5, 30, hour, tzinfo=timezone.utc),
+        }
+    return make
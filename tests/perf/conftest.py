@@ -0,0 +1,108 @@
+"""Shared helpers for the performance regression suite (run with `make tests_perf`).
+
+Each benchmark reports a throughput (operations per second) and the peak memory allocated while
+running one batch. Both are compared against tests/perf/baselines.json:
+
+* PERF_TOLERANCE (default 0.5) is the allowed relative regression: with 0.5 a benchmark fails when
+  its throughput drops below half the baseline or its peak allocation grows past 1.5x the baseline.
+* PERF_UPDATE_BASELINES=1 records the measured values as the new baselines instead of asserting.
+"""
+import json
+import os
+import time
+import tracemalloc
+
+import pytest
+from loguru import logger
+
+BASELINES_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+PERF_TOLERANCE = float(os.getenv("PERF_TOLERANCE", "0.5"))
+PERF_UPDATE_BASELINES = os.getenv("PERF_UPDATE_BASELINES", "") == "1"
+
+
+def pytest_collection_modifyitems(items):
+    perf_dir = os.path.dirname(__file__)
+    for item in items:
+        if str(item.fspath).startswith(perf_dir):
+            item.add_marker(pytest.mark.perf)
+
+
+def load_baselines():
+    if not os.path.exists(BASELINES_PATH):
+        return {}
+    with open(BASELINES_PATH, "r") as f:
+        return json.load(f)
+
+
+class PerfRecorder:
+    """Measures benchmarks and compares them with the stored baselines"""
+
+    def __init__(self, baselines, tolerance):
+        self.baselines = baselines
+        self.tolerance = tolerance
+        self.measured = {}
+
+    @staticmethod
+    def throughput(run, operations: int, repeats: int = 3, setup=None) -> float:
+        """Best-of-repeats operations per second; the best run is the least disturbed by noise.
+
+        When given, setup() runs untimed before each repeat and its result is passed to run.
+        """
+        best = float("inf")
+        for _ in range(repeats):
+            args = (setup(),) if setup else ()
+            start = time.perf_counter()
+            run(*args)
+            best = min(best, time.perf_counter() - start)
+        return operations / best
+
+    @staticmethod
+    def peak_kib(run, setup=None) -> float:
+        """Peak memory allocated by one run, measured separately because tracing slows it down"""
+        args = (setup(),) if setup else ()
+        tracemalloc.start()
+        try:
+            run(*args)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return peak / 1024
+
+    def check(self, name: str, ops_per_sec: float, peak_kib: float):
+        self.measured[name] = {"ops_per_sec": round(ops_per_sec, 1), "peak_kib": round(peak_kib, 1)}
+        if PERF_UPDATE_BASELINES:
+            return
+
+        baseline = self.baselines.get(name)
+        if baseline is None:
+            pytest.fail(f"No baseline for {name}; run with PERF_UPDATE_BASELINES=1 to record one")
+
+        min_ops = baseline["ops_per_sec"] * (1 - self.tolerance)
+        max_kib = baseline["peak_kib"] * (1 + self.tolerance)
+        assert ops_per_sec >= min_ops, (
+            f"{name}: throughput regressed to {ops_per_sec:.0f} ops/s "
+            f"(baseline {baseline['ops_per_sec']:.0f}, minimum {min_ops:.0f})"
+        )
+        assert peak_kib <= max_kib, (
+            f"{name}: peak allocation grew to {peak_kib:.0f} KiB "
+            f"(baseline {baseline['peak_kib']:.0f}, maximum {max_kib:.0f})"
+        )
+
+
+@pytest.fixture(scope="session")
+def perf():
+    recorder = PerfRecorder(load_baselines(), PERF_TOLERANCE)
+    yield recorder
+    if PERF_UPDATE_BASELINES and recorder.measured:
+        baselines = {**recorder.baselines, **recorder.measured}
+        with open(BASELINES_PATH, "w") as f:
+            json.dump(dict(sorted(baselines.items())), f, indent=2)
+            f.write("\n")
+
+
+@pytest.fixture(autouse=True)
+def quiet_logs():
+    # Log formatting would dominate the flow benchmarks and make them measure loguru
+    logger.disable("src")
+    yield
+    logger.enable("src")
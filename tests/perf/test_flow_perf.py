@@ -0,0 +1,88 @@
+import asyncio
+import json
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.client.repository import ClientRepository
+from src.main import IntegrationService
+from src.tracos.memory import InMemoryTracOSRepository
+from src.utils.checkpoint import SyncCheckpoint
+
+WORKORDERS = 500
+
+
+def make_service(store, inbound_dir, outbound_dir, checkpoint_root):
+    """The service as main() builds it, checkpoint included, with one outbound batch for every workorder"""
+    return IntegrationService(
+        tracos_repo=store,
+        client_repo=ClientRepository(inbound_dir, outbound_dir),
+        inbound_workers=1,
+        outbound_sync_mode="flag",
+        outbound_batch_size=WORKORDERS,
+        # A fresh checkpoint per run, or inbound would skip the files persisted by the previous one
+        checkpoint=SyncCheckpoint(tempfile.mkdtemp(dir=checkpoint_root)),
+    )
+
+
+@pytest.fixture(scope="module")
+def inbound_dir(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("inbound")
+    for i in range(1, WORKORDERS + 1):
+        workorder = {
+            "orderNo": i,
+            "summary": f"Benchmark workorder #{i}",
+            "description": "x" * 200,
+            "creationDate": "2025-05-01T22:36:24.105812+00:00",
+            "lastUpdateDate": "2025-05-01T23:36:24.105812+00:00",
+            "isDone": False,
+            "isCanceled": False,
+            "isDeleted": False,
+            "isOnHold": False,
+            "isPending": True,
+        }
+        with open(directory / f"workorder_{i}.json", "w") as f:
+            json.dump(workorder, f)
+    return str(directory)
+
+
+def test_inbound_flow(perf, inbound_dir, tmp_path):
+    """Client files → in-memory TracOS store, every workorder created"""
+
+    def setup():
+        return make_service(InMemoryTracOSRepository(), inbound_dir, str(tmp_path), str(tmp_path))
+
+    def run(service):
+        written, _ = asyncio.run(service.process_inbound())
+        assert written == WORKORDERS
+
+    perf.check("flow_inbound", perf.throughput(run, WORKORDERS, setup=setup), perf.peak_kib(run, setup=setup))
+
+
+def test_outbound_flow(perf, tmp_path):
+    """In-memory TracOS store → client files, every workorder exported and marked synced"""
+    created = datetime(2025, 5, 1, tzinfo=timezone.utc)
+
+    def setup():
+        store = InMemoryTracOSRepository()
+        workorders = [
+            {
+                "number": i,
+                "title": f"Benchmark workorder #{i}",
+                "description": "x" * 200,
+                "status": "pending",
+                "deleted": False,
+                "createdAt": created,
+                "updatedAt": created + timedelta(minutes=i),
+            }
+            for i in range(1, WORKORDERS + 1)
+        ]
+        asyncio.run(store.save_workorders(workorders))
+        return make_service(store, str(tmp_path), str(tmp_path), str(tmp_path))
+
+    def run(service):
+        exported, _ = asyncio.run(service.process_outbound())
+        assert exported == WORKORDERS
+
+    perf.check("flow_outbound", perf.throughput(run, WORKORDERS, setup=setup), perf.peak_kib(run, setup=setup))
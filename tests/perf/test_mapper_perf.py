@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+from src.client.repository import ClientRepository
+from src.translation.mapper import WorkorderMapper
+
+BATCH = 2000
+
+
+@pytest.fixture
+def client_workorders():
+    return [
+        {
+            "orderNo": i,
+            "summary": f"Replace bearing #{i}",
+            "description": "x" * 200,
+            "creationDate": "2025-05-30T10:00:00.000Z",
+            "lastUpdateDate": "2025-05-30T11:00:00.000000+00:00",
+            "isDone": i % 3 == 0,
+            "isCanceled": False,
+            "isDeleted": False,
+            "isOnHold": False,
+            "isPending": i % 3 != 0,
+        }
+        for i in range(BATCH)
+    ]
+
+
+@pytest.fixture
+def tracos_workorders(client_workorders):
+    return [WorkorderMapper.client_to_tracos(workorder) for workorder in client_workorders]
+
+
+def test_client_to_tracos(perf, client_workorders):
+    def run():
+        return [WorkorderMapper.client_to_tracos(workorder) for workorder in client_workorders]
+
+    perf.check("mapper_client_to_tracos", perf.throughput(run, BATCH), perf.peak_kib(run))
+
+
+def test_tracos_to_client(perf, tracos_workorders):
+    def run():
+        return [WorkorderMapper.tracos_to_client(workorder) for workorder in tracos_workorders]
+
+    perf.check("mapper_tracos_to_client", perf.throughput(run, BATCH), perf.peak_kib(run))
+
+
+def test_fingerprint(perf, tracos_workorders):
+    def run():
+        return [WorkorderMapper.fingerprint(workorder) for workorder in tracos_workorders]
+
+    perf.check("mapper_fingerprint", perf.throughput(run, BATCH), perf.peak_kib(run))
+
+
+def test_validate_inbound_workorder(perf, client_workorders):
+    client_repo = ClientRepository()
+
+    def run():
+        return [client_repo._validate_inbound_workorder(workorder) for workorder in client_workorders]
+
+    perf.check("client_validate_inbound", perf.throughput(run, BATCH), perf.peak_kib(run))
+
+
+def test_read_inbound_file(perf, tmp_path, client_workorders):
+    for workorder in client_workorders:
+        with open(tmp_path / f"{workorder['orderNo']}.json", "w") as f:
+            json.dump(workorder, f)
+    client_repo = ClientRepository(inbound_dir=str(tmp_path), outbound_dir=str(tmp_path))
+    file_names = client_repo.list_inbound_files()
+
+    def run():
+        return [client_repo.read_inbound_file(file_name) for file_name in file_names]
+
+    perf.check("client_read_inbound_file", perf.throughput(run, BATCH), perf.peak_kib(run))
@@ -0,0 +1,244 @@
+import asyncio
+import json
+import os
+import pytest
+import pytest_asyncio
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import AsyncMock
+
+from src.client.repository import ClientRepository
+from src.main import IntegrationService
+from src.tracos.memory import InMemoryTracOSRepository
+from src.utils.checkpoint import CheckpointStore, SyncCheckpoint
+
+
+@pytest.fixture
+def write_inbound(client_workorder):
+    def write(inbound_dir, order_no, summary="Replace bearing"):
+        with open(os.path.join(inbound_dir, f"{order_no}.json"), "w") as f:
+            json.dump({**client_workorder, "orderNo": order_no, "summary": summary}, f)
+    return write
+
+
+class FirstChunkFails(ThreadPoolExecutor):
+    """Runs ingestion chunks in threads, failing the first one like a crashed worker"""
+    failed = False
+
+    def submit(self, fn, *args, **kwargs):
+        if not self.failed:
+            self.failed = True
+
+            def fn(*_):
+                raise RuntimeError("worker crashed")
+        return super().submit(fn, *args, **kwargs)
+
+
+@pytest.fixture
+def dirs(tmp_path):
+    inbound_dir, outbound_dir = tmp_path / "inbound", tmp_path / "outbound"
+    inbound_dir.mkdir()
+    outbound_dir.mkdir()
+    return str(inbound_dir), str(outbound_dir), str(tmp_path / "checkpoints")
+
+
+@pytest_asyncio.fixture
+async def store():
+    repo = InMemoryTracOSRepository()
+    await repo.connect()
+    return repo
+
+
+def make_service(store, dirs, **options):
+    inbound_dir, outbound_dir, checkpoint_dir = dirs
+    return IntegrationService(
+        tracos_repo=store,
+        client_repo=ClientRepository(inbound_dir, outbound_dir),
+        checkpoint=SyncCheckpoint(checkpoint_dir),
+        shutdown_event=asyncio.Event(),
+        **{"inbound_workers": 1, "outbound_sync_mode": "flag", **options},
+    )
+
+
+def test_checkpoint_store_round_trip_and_corrupt_file(tmp_path):
+    path = str(tmp_path / "state" / "checkpoint.json")
+    checkpoint = CheckpointStore(path)
+    checkpoint.data["a.json"] = [1, 2]
+    checkpoint.save()
+
+    assert CheckpointStore(path).data == {"a.json": [1, 2]}
+    assert not os.path.exists(f"{path}.tmp")
+
+    with open(path, "w") as f:
+        f.write("{truncated")
+    assert CheckpointStore(path).data == {}
+
+
+@pytest.mark.asyncio
+class TestResumableInbound:
+
+    async def test_restart_skips_files_already_persisted(self, store, dirs, write_inbound):
+        """Tests that a restarted service does not re-read unchanged inbound files."""
+        inbound_dir = dirs[0]
+        write_inbound(inbound_dir, 1)
+        write_inbound(inbound_dir, 2)
+        await make_service(store, dirs).process_inbound()
+
+        restarted = make_service(store, dirs)
+        store.save_workorder = AsyncMock(wraps=store.save_workorder)
+        await restarted.process_inbound()
+
+        assert restarted.metrics.get("inbound_files_skipped") == 2
+        store.save_workorder.assert_not_awaited()
+
+    async def test_changed_file_is_read_again(self, store, dirs, write_inbound):
+        """Tests that a file modified after being checkpointed is processed again."""
+        inbound_dir = dirs[0]
+        write_inbound(inbound_dir, 1)
+        write_inbound(inbound_dir, 2)
+        await make_service(store, dirs).process_inbound()
+
+        write_inbound(inbound_dir, 2, summary="Replace bearing and seal")
+        restarted = make_service(store, dirs)
+        await restarted.process_inbound()
+
+        assert restarted.metrics.get("inbound_files_skipped") == 1
+        assert restarted.metrics.get("inbound_saved") == 1
+
+    async def test_workorders_deferred_by_shutdown_are_not_checkpointed(self, store, dirs, write_inbound):
+        """Tests that work skipped because of a shutdown is picked up by the next run."""
+        inbound_dir = dirs[0]
+        write_inbound(inbound_dir, 1)
+        service = make_service(store, dirs)
+        service.shutdown_event.set()
+
+        assert await service.process_inbound() == (0, True)
+
+        restarted = make_service(store, dirs)
+        await restarted.process_inbound()
+        assert restarted.metrics.get("inbound_files_skipped") == 0
+        assert restarted.metrics.get("inbound_saved") == 1
+
+    async def test_files_of_a_failed_chunk_are_not_checkpointed(self, store, dirs, write_inbound):
+        """Tests that files lost with a failed worker chunk are read again by the next cycle."""
+        inbound_dir = dirs[0]
+        for order_no in range(1, 5):
+            write_inbound(inbound_dir, order_no)
+        executor = FirstChunkFails(max_workers=2)
+        try:
+            service = make_service(store, dirs, inbound_workers=2, inbound_chunk_size=1, ingest_executor=executor)
+            assert await service.process_inbound() == (3, False)
+            assert await service.process_inbound() == (1, False)
+        finally:
+            service.close()
+            executor.shutdown()
+
+        assert len(store.documents) == 4
+
+    async def test_unreadable_file_is_not_checkpointed(self, store, dirs, write_inbound):
+        """Tests that a file hit by an I/O error is retried, unlike a file with invalid content."""
+        inbound_dir = dirs[0]
+        write_inbound(inbound_dir, 1)
+        os.mkdir(os.path.join(inbound_dir, "2.json"))
+        with open(os.path.join(inbound_dir, "3.json"), "w") as f:
+            f.write("{not json")
+        await make_service(store, dirs).process_inbound()
+
+        restarted = make_service(store, dirs)
+        await restarted.process_inbound()
+
+        assert restarted.metrics.get("inbound_files_skipped") == 2
+
+    async def test_backlog_ends_after_a_full_pass_without_checkpoint(self, store, dirs, write_inbound):
+        """Tests that unchanged files re-read without a checkpoint do not keep the flow busy."""
+        inbound_dir = dirs[0]
+        for order_no in range(1, 6):
+            write_inbound(inbound_dir, order_no)
+        service = make_service(store, dirs, inbound_batch_size=2)
+        service.checkpoint = None
+
+        cycles = [await service.process_inbound() for _ in range(5)]
+
+        assert cycles == [(2, True), (2, True), (1, False), (0, False), (0, False)]
+
+@pytest.mark.asyncio
+class TestResumableOutbound:
+
+    async def test_written_but_unmarked_workorder_is_not_exported_again(self, store, dirs, tracos_workorder):
+        """Tests that a restart only marks a workorder that was written before the interruption."""
+        await store.save_workorder(tracos_workorder(1))
+        service = make_service(store, dirs)
+        store.mark_as_synced = AsyncMock(side_effect=ConnectionError("lost connection"))
+        await service.process_outbound()
+        assert len(service.checkpoint.pending_exports()) == 1
+
+        del store.mark_as_synced
+        restarted = make_service(store, dirs)
+        restarted.client_repo.write_outbound_workorder = AsyncMock(return_value=True)
+        await restarted.process_outbound()
+
+        restarted.client_repo.write_outbound_workorder.assert_not_awaited()
+        assert restarted.metrics.get("outbound_resumed") == 1
+        assert restarted.checkpoint.pending_exports() == {}
+        assert await store.get_unsynchronized_workorders() == []
+
+    async def test_unmarked_workorder_stays_pending_and_is_not_counted(self, store, dirs, tracos_workorder):
+        """Tests that a failed sync marking keeps the checkpoint entry and does not count as an export."""
+        await store.save_workorder(tracos_workorder(1))
+        service = make_service(store, dirs)
+        store.mark_as_synced = AsyncMock(return_value=False)
+
+        assert await service.process_outbound() == (0, False)
+
+        assert len(service.checkpoint.pending_exports()) == 1
+        assert service.metrics.get("outbound_written") == 0
+        assert service.metrics.get("outbound_failed") == 1
+
+    async def test_lost_lease_drops_the_pending_export(self, store, dirs, tracos_workorder):
+        """Tests that a workorder whose lease was taken over is left to the new owner."""
+        await store.save_workorder(tracos_workorder(1))
+        service = make_service(store, dirs, outbound_sync_mode="lease", instance_id="a")
+        store.mark_as_synced = AsyncMock(return_value=False)
+
+        assert await service.process_outbound() == (0, False)
+
+        assert service.checkpoint.pending_exports() == {}
+        assert service.metrics.get("outbound_lease_lost") == 1
+        assert service.metrics.get("outbound_failed") == 0
+
+    async def test_checkpoint_is_saved_twice_per_cycle(self, store, dirs, tracos_workorder):
+        """Tests that exports are recorded and cleared in bulk rather than one save per export."""
+        for number in range(1, 6):
+            await store.save_workorder(tracos_workorder(number))
+        service = make_service(store, dirs, outbound_concurrency=2)
+        saves = []
+        service.checkpoint._outbound.save = lambda: saves.append(dict(service.checkpoint._outbound.data))
+
+        assert await service.process_outbound() == (5, False)
+
+        assert [len(saved) for saved in saves] == [5, 0]
+
+    async def test_shutdown_stops_starting_new_windows(self, store, dirs, tracos_workorder):
+        """Tests that outbound stops between windows once shutdown is requested."""
+        for number in range(1, 5):
+            await store.save_workorder(tracos_workorder(number))
+        service = make_service(store, dirs, outbound_concurrency=2)
+
+        async def write_then_shutdown(client_workorder):
+            service.shutdown_event.set()
+            return True
+
+        service.client_repo.write_outbound_workorder = AsyncMock(side_effect=write_then_shutdown)
+        handled, _ = await service.process_outbound()
+
+        assert handled == 2
+        assert len(await store.get_unsynchronized_workorders()) == 2
+
+    async def test_drain_deadline_cancels_stuck_work(self, store, dirs):
+        """Tests that shutdown waits at most shutdown_drain_seconds for in-flight work."""
+        service = make_service(store, dirs, shutdown_drain_seconds=0.05)
+        work = asyncio.ensure_future(asyncio.sleep(10))
+        asyncio.get_running_loop().call_later(0.01, service.shutdown_event.set)
+
+        await asyncio.wait_for(service.drain_on_shutdown(work), timeout=1)
+
+        assert work.cancelled()
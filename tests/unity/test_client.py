@@ -1,5 +1,7 @@
 import pytest
 from src.client.repository import ClientRepository
+from src.client.retention import compact_outbound
+from datetime import datetime, timedelta, timezone
 import json
 import os
 
@@ -66,3 +68,69 @@ async def test_order_content(data_dirs, create_n_orders, n_orders):
     assert "creationDate" in result[0]
     assert "lastUpdateDate" in result[0]
     assert "deletedDate" in result[0]
+
+@pytest.mark.asyncio
+async def test_hashed_layout_spreads_files(data_dirs):
+    inbound_dir, outbound_dir = data_dirs
+    client = ClientRepository(inbound_dir, outbound_dir, outbound_layout="hashed")
+
+    assert await client.write_outbound_workorder({"orderNo": 42, "summary": "hashed"})
+
+    file_path = client.outbound_path(42)
+    assert os.path.exists(file_path)
+    assert len(os.path.relpath(file_path, outbound_dir).split(os.sep)) == 3
+    assert client.get_latest_outbound_workorder(42)["summary"] == "hashed"
+
+@pytest.mark.asyncio
+async def test_date_layout_finds_latest_day(data_dirs):
+    inbound_dir, outbound_dir = data_dirs
+    client = ClientRepository(inbound_dir, outbound_dir, outbound_layout="date")
+    for day, summary in [(datetime(2025, 5, 1), "old"), (datetime(2025, 6, 2), "new")]:
+        file_path = client.outbound_path(7, written_at=day)
+        os.makedirs(os.path.dirname(file_path))
+        with open(file_path, "w") as f:
+            json.dump({"orderNo": 7, "summary": summary}, f)
+
+    assert client.get_latest_outbound_workorder(7)["summary"] == "new"
+    assert client.get_latest_outbound_workorder(8) is None
+
+@pytest.mark.asyncio
+async def test_compaction_archives_old_files_and_keeps_lookup(data_dirs):
+    inbound_dir, outbound_dir = data_dirs
+    client = ClientRepository(inbound_dir, outbound_dir, outbound_layout="hashed")
+    await client.write_outbound_workorder({"orderNo": 1, "summary": "old"})
+    await client.write_outbound_workorder({"orderNo": 2, "summary": "recent"})
+    old_time = (datetime.now(timezone.utc) - timedelta(days=40)).timestamp()
+    os.utime(client.outbound_path(1), (old_time, old_time))
+
+    archived = compact_outbound(outbound_dir, older_than_days=30)
+
+    assert archived == 1
+    assert not os.path.exists(client.outbound_path(1))
+    assert os.path.exists(client.outbound_path(2))
+    assert os.listdir(os.path.join(outbound_dir, "archive")) == [
+        datetime.fromtimestamp(old_time, timezone.utc).strftime("%Y-%m-%d") + ".jsonl.gz"
+    ]
+    assert client.get_latest_outbound_workorder(1)["summary"] == "old"
+
+@pytest.mark.asyncio
+async def test_compaction_keeps_file_rewritten_after_the_scan(data_dirs, monkeypatch):
+    inbound_dir, outbound_dir = data_dirs
+    client = ClientRepository(inbound_dir, outbound_dir)
+    await client.write_outbound_workorder({"orderNo": 1, "summary": "old"})
+    old_time = (datetime.now(timezone.utc) - timedelta(days=40)).timestamp()
+    os.utime(client.outbound_path(1), (old_time, old_time))
+    rename = os.rename
+
+    def rewrite_then_rename(src, dst):
+        # The exporter writes a new version between the scan and the archiving
+        if src == client.outbound_path(1):
+            with open(src, "w") as f:
+                json.dump({"orderNo": 1, "summary": "new"}, f)
+        rename(src, dst)
+
+    monkeypatch.setattr("src.client.retention.os.rename", rewrite_then_rename)
+
+    assert compact_outbound(outbound_dir, older_than_days=30) == 0
+    assert client.get_latest_outbound_workorder(1)["summary"] == "new"
+    assert not any(name.endswith(".compacting") for name in os.listdir(outbound_dir))
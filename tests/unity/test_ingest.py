@@ -0,0 +1,83 @@
+import json
+import os
+
+import pytest
+
+from src.client.ingest import ParallelInboundIngestor, parse_and_map_files, shard_files
+from src.client.repository import ClientRepository
+from src.translation.mapper import WorkorderMapper
+
+
+class TaggingMapper(WorkorderMapper):
+    """Module-level so worker processes can unpickle it"""
+
+    @staticmethod
+    def client_to_tracos(client_workorder):
+        return {**WorkorderMapper.client_to_tracos(client_workorder), "title": "tagged"}
+
+
+@pytest.fixture
+def inbound_dir(tmp_path):
+    directory = tmp_path / "inbound"
+    directory.mkdir()
+    for i in range(1, 21):
+        workorder = {
+            "orderNo": i,
+            "isCanceled": False,
+            "isDeleted": False,
+            "isDone": i % 2 == 0,
+            "summary": f"Example workorder #{i}",
+            "creationDate": "2025-05-01T22:36:24.105812+00:00",
+            "lastUpdateDate": "2025-05-01T23:36:24.105812+00:00",
+        }
+        with open(directory / f"workorder_{i}.json", "w") as f:
+            json.dump(workorder, f)
+    with open(directory / "broken.json", "w") as f:
+        f.write("{not json")
+    return str(directory)
+
+
+def test_shard_files_is_stable_and_complete():
+    file_names = [f"workorder_{i}.json" for i in range(100)]
+    chunks = shard_files(file_names, shards=4, chunk_size=10)
+
+    assert sorted(name for chunk in chunks for name in chunk) == sorted(file_names)
+    assert all(len(chunk) <= 10 for chunk in chunks)
+    assert chunks == shard_files(file_names, shards=4, chunk_size=10)
+
+
+def test_parse_and_map_files_skips_invalid(inbound_dir):
+    file_names = sorted(os.listdir(inbound_dir))
+    mapped = parse_and_map_files(inbound_dir, file_names)
+
+    assert len(mapped) == 20
+    assert {wo["number"] for wo in mapped} == set(range(1, 21))
+    assert all(wo["status"] in ("completed", "pending") for wo in mapped)
+
+
+@pytest.mark.asyncio
+async def test_parallel_ingestor_maps_all_files(inbound_dir):
+    client_repo = ClientRepository(inbound_dir=inbound_dir, outbound_dir=inbound_dir)
+    ingestor = ParallelInboundIngestor(client_repo, workers=2, chunk_size=3)
+    try:
+        numbers = []
+        async for batch in ingestor.iter_mapped_batches():
+            numbers.extend(wo["number"] for wo in batch)
+    finally:
+        ingestor.shutdown()
+
+    assert sorted(numbers) == list(range(1, 21))
+
+
+@pytest.mark.asyncio
+async def test_parallel_ingestor_uses_the_given_mapper(inbound_dir):
+    client_repo = ClientRepository(inbound_dir=inbound_dir, outbound_dir=inbound_dir)
+    ingestor = ParallelInboundIngestor(client_repo, workers=2, chunk_size=5, mapper=TaggingMapper())
+    try:
+        titles = set()
+        async for mapped, _ in ingestor.iter_mapped_batches(with_file_names=True):
+            titles.update(wo["title"] for _, wo in mapped)
+    finally:
+        ingestor.shutdown()
+
+    assert titles == {"tagged"}
@@ -86,3 +86,13 @@ class TestWorkorderMapper:
         del sample_client_workorder["creationDate"]
         tracos_result = WorkorderMapper.client_to_tracos(sample_client_workorder)
         assert isinstance(tracos_result["createdAt"], datetime)
+
+    def test_fingerprint_tracks_client_visible_content(self, sample_tracos_workorder):
+        """Tests that the fingerprint ignores sync bookkeeping but not content changes."""
+        fingerprint = WorkorderMapper.fingerprint(sample_tracos_workorder)
+
+        touched = {**sample_tracos_workorder, "isSynced": True, "updatedAt": datetime.now(timezone.utc)}
+        assert WorkorderMapper.fingerprint(touched) == fingerprint
+
+        changed = {**sample_tracos_workorder, "status": "completed"}
+        assert WorkorderMapper.fingerprint(changed) != fingerprint
@@ -0,0 +1,30 @@
+from src.utils.scheduling import AdaptiveSchedule, TimeBudget
+
+
+def test_backlog_runs_again_immediately():
+    schedule = AdaptiveSchedule(base_interval=5, max_interval=60)
+    assert schedule.next_delay(processed=100, has_backlog=True) == 0
+
+
+def test_idle_cycles_back_off_up_to_ceiling():
+    schedule = AdaptiveSchedule(base_interval=5, max_interval=30, backoff_factor=2)
+    delays = [schedule.next_delay(processed=0, has_backlog=False) for _ in range(5)]
+    assert delays == [5, 10, 20, 30, 30]
+
+
+def test_work_resets_backoff():
+    schedule = AdaptiveSchedule(base_interval=5, max_interval=30)
+    for _ in range(3):
+        schedule.next_delay(processed=0, has_backlog=False)
+
+    assert schedule.next_delay(processed=1, has_backlog=False) == 5
+    assert schedule.next_delay(processed=0, has_backlog=False) == 5
+
+
+def test_unlimited_time_budget_never_expires():
+    assert TimeBudget(0).expired() is False
+    assert TimeBudget(None).expired() is False
+
+
+def test_spent_time_budget_expires():
+    assert TimeBudget(1e-9).expired() is True
@@ -0,0 +1,341 @@
+import asyncio
+import pytest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock
+from bson import ObjectId
+
+from src.main import IntegrationService
+from src.tracos.repository import SAVE_CREATED, SAVE_FAILED, SAVE_STALE
+from src.translation.mapper import WorkorderMapper
+
+
+@pytest.fixture
+def service():
+    tracos_repo = MagicMock()
+    tracos_repo.save_workorder = AsyncMock(return_value=SAVE_CREATED)
+
+    async def save_workorders(workorders):
+        return [await tracos_repo.save_workorder(workorder) for workorder in workorders]
+
+    tracos_repo.save_workorders = AsyncMock(side_effect=save_workorders)
+    tracos_repo.get_unsynchronized_workorders = AsyncMock(return_value=[])
+    tracos_repo.mark_as_synced = AsyncMock(return_value=True)
+    client_repo = MagicMock()
+    client_repo.list_inbound_files = MagicMock(return_value=[])
+    client_repo.read_inbound_file = MagicMock(return_value=None)
+    client_repo.write_outbound_workorder = AsyncMock(return_value=True)
+    return IntegrationService(tracos_repo=tracos_repo, client_repo=client_repo, inbound_workers=1, outbound_sync_mode="flag")
+
+
+def serve_inbound(service, files):
+    """Make the mocked inbound directory list files (name -> client workorder) in the given order"""
+    service.client_repo.list_inbound_files.return_value = list(files)
+    service.client_repo.read_inbound_file.side_effect = lambda file_name, **_: files.get(file_name)
+
+
+def unsynced_workorders(client_workorder, count):
+    """TracOS workorders mapped from client_workorder with orderNo 0..count-1, not yet exported"""
+    workorders = []
+    for i in range(count):
+        workorder = WorkorderMapper.client_to_tracos({**client_workorder, "orderNo": i})
+        workorder.update({"_id": ObjectId(), "isSynced": False})
+        workorders.append(workorder)
+    return workorders
+
+
+@pytest.mark.asyncio
+class TestEchoSuppression:
+
+    async def test_inbound_records_origin_and_client_hash(self, service, client_workorder):
+        """Tests that inbound writes remember the content the client already has."""
+        serve_inbound(service, {"7.json": client_workorder})
+
+        await service.process_inbound()
+
+        saved = service.tracos_repo.save_workorder.call_args[0][0]
+        assert saved["syncOrigin"] == "client"
+        assert saved["clientHash"] == WorkorderMapper.fingerprint(saved)
+        assert service.metrics.get("inbound_saved") == 1
+
+    async def test_stale_writes_are_counted_apart_from_failures(self, service, client_workorder):
+        """Tests that rejected stale writes do not count as failures."""
+        serve_inbound(service, {"7.json": client_workorder, "8.json": {**client_workorder, "orderNo": 8}})
+        service.tracos_repo.save_workorder.side_effect = [SAVE_STALE, SAVE_FAILED]
+
+        await service.process_inbound()
+
+        assert service.metrics.get("inbound_stale_rejected") == 1
+        assert service.metrics.get("inbound_failed") == 1
+        assert service.metrics.get("inbound_saved") == 0
+
+    async def test_outbound_skips_client_echo(self, service, client_workorder):
+        """Tests that a client-originated change is marked synced without writing a file."""
+        echoed = WorkorderMapper.client_to_tracos(client_workorder)
+        echoed.update({"_id": ObjectId(), "isSynced": False, "clientHash": WorkorderMapper.fingerprint(echoed)})
+        service.tracos_repo.get_unsynchronized_workorders.return_value = [echoed]
+
+        await service.process_outbound()
+
+        service.client_repo.write_outbound_workorder.assert_not_awaited()
+        service.tracos_repo.mark_as_synced.assert_awaited_once()
+        assert service.metrics.get("outbound_echo_suppressed") == 1
+
+    async def test_outbound_exports_tracos_change(self, service, client_workorder):
+        """Tests that a change made in TracOS after the last exchange is exported."""
+        changed = WorkorderMapper.client_to_tracos(client_workorder)
+        changed.update({"_id": ObjectId(), "isSynced": False, "clientHash": WorkorderMapper.fingerprint(changed)})
+        changed["status"] = "completed"
+        service.tracos_repo.get_unsynchronized_workorders.return_value = [changed]
+
+        await service.process_outbound()
+
+        service.client_repo.write_outbound_workorder.assert_awaited_once()
+        assert service.tracos_repo.mark_as_synced.call_args.kwargs["client_hash"] == WorkorderMapper.fingerprint(changed)
+        assert service.metrics.get("outbound_written") == 1
+
+
+@pytest.mark.asyncio
+class TestWatermarkOutbound:
+
+    async def test_watermark_advances_past_exported_workorders(self, service, client_workorder):
+        """Tests that the watermark moves to the last exported workorder without sync flags."""
+        workorders = unsynced_workorders(client_workorder, 3)
+        service.outbound_sync_mode = "watermark"
+        service.mark_synced = False
+        service.tracos_repo.load_watermark = AsyncMock(return_value=None)
+        service.tracos_repo.get_workorders_after = AsyncMock(return_value=workorders)
+        service.tracos_repo.save_watermark = AsyncMock(return_value=True)
+        service.tracos_repo.record_client_hashes = AsyncMock(return_value=3)
+
+        await service.process_outbound()
+
+        assert service.client_repo.write_outbound_workorder.await_count == 3
+        service.tracos_repo.mark_as_synced.assert_not_awaited()
+        service.tracos_repo.record_client_hashes.assert_awaited_once_with(
+            {str(wo["_id"]): WorkorderMapper.fingerprint(wo) for wo in workorders}
+        )
+        service.tracos_repo.save_watermark.assert_awaited_once_with(
+            {"updatedAt": workorders[-1]["updatedAt"], "_id": workorders[-1]["_id"]}
+        )
+
+    async def test_watermark_holds_when_client_hashes_are_not_recorded(self, service, client_workorder):
+        """Tests that exports whose clientHash could not be stored are retried from the old watermark."""
+        service.outbound_sync_mode = "watermark"
+        service.mark_synced = False
+        service.tracos_repo.load_watermark = AsyncMock(return_value=None)
+        service.tracos_repo.get_workorders_after = AsyncMock(return_value=unsynced_workorders(client_workorder, 2))
+        service.tracos_repo.save_watermark = AsyncMock(return_value=True)
+        service.tracos_repo.record_client_hashes = AsyncMock(side_effect=ConnectionError("lost connection"))
+
+        await service.process_outbound()
+
+        service.tracos_repo.save_watermark.assert_not_awaited()
+
+    async def test_watermark_scan_lags_behind_the_clock(self, service):
+        """Tests that the scan only reads workorders older than the safety lag."""
+        service.outbound_sync_mode = "watermark"
+        service.watermark_lag = 60
+        service.tracos_repo.load_watermark = AsyncMock(return_value=None)
+        service.tracos_repo.get_workorders_after = AsyncMock(return_value=[])
+        before = datetime.now(timezone.utc).replace(tzinfo=None)
+
+        await service.process_outbound()
+
+        until = service.tracos_repo.get_workorders_after.call_args.kwargs["until"]
+        assert before - timedelta(seconds=61) < until <= before - timedelta(seconds=59)
+
+    async def test_watermark_stops_at_first_failure(self, service, client_workorder):
+        """Tests that a failed export keeps the watermark before it so it is retried."""
+        workorders = unsynced_workorders(client_workorder, 3)
+        service.outbound_sync_mode = "watermark"
+        service.tracos_repo.load_watermark = AsyncMock(return_value=None)
+        service.tracos_repo.get_workorders_after = AsyncMock(return_value=workorders)
+        service.tracos_repo.save_watermark = AsyncMock(return_value=True)
+        service.client_repo.write_outbound_workorder.side_effect = [True, False, True]
+
+        await service.process_outbound()
+
+        assert service.client_repo.write_outbound_workorder.await_count == 2
+        service.tracos_repo.save_watermark.assert_awaited_once_with(
+            {"updatedAt": workorders[0]["updatedAt"], "_id": workorders[0]["_id"]}
+        )
+
+
+@pytest.mark.asyncio
+class TestInboundCoalescing:
+
+    async def test_duplicates_collapse_to_newest(self, service, client_workorder):
+        """Tests that only the newest record per orderNo is persisted, whatever the read order."""
+        newest = {**client_workorder, "summary": "newest", "lastUpdateDate": "2025-05-30T13:00:00+00:00"}
+        older = {**client_workorder, "summary": "older", "lastUpdateDate": "2025-05-30T12:00:00+00:00"}
+        other = {**client_workorder, "orderNo": 8}
+        serve_inbound(service, {"a.json": newest, "b.json": other, "c.json": older})
+
+        await service.process_inbound()
+
+        saved = [call.args[0] for call in service.tracos_repo.save_workorder.call_args_list]
+        assert sorted(wo["number"] for wo in saved) == [7, 8]
+        assert next(wo for wo in saved if wo["number"] == 7)["title"] == "newest"
+        assert service.metrics.get("inbound_duplicates_collapsed") == 1
+
+    @pytest.mark.parametrize("arrival", [["a.json", "b.json"], ["b.json", "a.json"]])
+    async def test_ties_go_to_last_file_name_whatever_the_chunk_order(self, service, client_workorder, arrival):
+        """Tests that equal lastUpdateDates resolve to the same record however chunks arrive."""
+        files = {"a.json": {**client_workorder, "summary": "from a"}, "b.json": {**client_workorder, "summary": "from b"}}
+        serve_inbound(service, {name: files[name] for name in arrival})
+        service.inbound_chunk_size = 1
+
+        await service.process_inbound()
+
+        last_saved = service.tracos_repo.save_workorder.call_args_list[-1].args[0]
+        assert last_saved["title"] == "from b"
+
+    async def test_newer_version_is_written_after_the_older_one_in_flight(self, service, client_workorder):
+        """Tests that concurrent chunk writes of the same workorder land in rank order."""
+        serve_inbound(service, {"a.json": {**client_workorder, "summary": "from a"}, "b.json": {**client_workorder, "summary": "from b"}})
+        service.inbound_chunk_size = 1
+        service.inbound_concurrency = 2
+        landed = []
+
+        async def slow_first_write(workorder):
+            await asyncio.sleep(0.02 if workorder["title"] == "from a" else 0)
+            landed.append(workorder["title"])
+            return SAVE_CREATED
+
+        service.tracos_repo.save_workorder.side_effect = slow_first_write
+
+        await service.process_inbound()
+
+        assert landed == ["from a", "from b"]
+
+    async def test_chunks_are_persisted_as_they_are_read(self, service, client_workorder):
+        """Tests that a chunk is written before the next one is read."""
+        files = {f"{i}.json": {**client_workorder, "orderNo": i} for i in range(3)}
+        serve_inbound(service, files)
+        service.inbound_chunk_size = 1
+        saved_before_read = []
+
+        def read(file_name, **_):
+            saved_before_read.append(service.tracos_repo.save_workorder.await_count)
+            return files[file_name]
+
+        service.client_repo.read_inbound_file.side_effect = read
+
+        await service.process_inbound()
+
+        assert saved_before_read == [0, 1, 2]
+
+
+@pytest.mark.asyncio
+class TestIndependentFlows:
+
+    async def test_inbound_batches_rotate_through_files(self, service):
+        """Tests that a bounded inbound batch walks the directory and wraps around."""
+        service.inbound_batch_size = 2
+        service.client_repo.list_inbound_files = MagicMock(return_value=["a.json", "b.json", "c.json"])
+
+        await service.process_inbound()
+        await service.process_inbound()
+
+        reads = [call.args[0] for call in service.client_repo.read_inbound_file.call_args_list]
+        assert reads == ["a.json", "b.json", "c.json", "a.json"]
+
+    async def test_outbound_exports_concurrently(self, service, client_workorder):
+        """Tests that outbound writes overlap up to outbound_concurrency."""
+        in_flight, peak = 0, 0
+
+        async def slow_write(_):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return True
+
+        service.outbound_concurrency = 3
+        service.tracos_repo.get_unsynchronized_workorders.return_value = unsynced_workorders(client_workorder, 6)
+        service.client_repo.write_outbound_workorder.side_effect = slow_write
+
+        await service.process_outbound()
+
+        assert peak == 3
+        assert service.metrics.get("outbound_written") == 6
+
+    async def test_flows_run_on_their_own_interval_and_stop_together(self, service, monkeypatch):
+        """Tests that both flows loop independently and exit on shutdown."""
+        shutdown_event = asyncio.Event()
+        monkeypatch.setattr("src.main.shutdown_event", shutdown_event)
+        service.tracos_repo.connect = AsyncMock()
+        service.tracos_repo.disconnect = AsyncMock()
+        service.inbound_interval = 0.01
+        service.outbound_interval = 10
+        service.idle_backoff_factor = 1
+
+        async def stop_later():
+            await asyncio.sleep(0.1)
+            shutdown_event.set()
+
+        await asyncio.wait_for(asyncio.gather(service.run_continuously(), stop_later()), timeout=2)
+
+        assert service.client_repo.list_inbound_files.call_count > 2
+        assert service.tracos_repo.get_unsynchronized_workorders.await_count == 1
+        service.tracos_repo.connect.assert_awaited_once()
+        service.tracos_repo.disconnect.assert_awaited_once()
+
+    async def test_run_once_reuses_existing_connection(self, service):
+        """Tests that a run started after connecting does not open a second connection."""
+        service.tracos_repo.connect = AsyncMock()
+        service.tracos_repo.disconnect = AsyncMock()
+
+        await service.connect()
+        await service.run_once()
+
+        service.tracos_repo.connect.assert_awaited_once()
+        service.tracos_repo.disconnect.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+class TestAdaptiveScheduling:
+
+    async def test_full_outbound_batch_reports_backlog(self, service, client_workorder):
+        """Tests that a full batch asks the scheduler to run again immediately."""
+        service.outbound_batch_size = 3
+        service.tracos_repo.get_unsynchronized_workorders.return_value = unsynced_workorders(client_workorder, 3)
+
+        assert await service.process_outbound() == (3, True)
+
+    async def test_partial_outbound_batch_has_no_backlog(self, service, client_workorder):
+        """Tests that a short batch means the queue is drained."""
+        service.outbound_batch_size = 10
+        service.tracos_repo.get_unsynchronized_workorders.return_value = unsynced_workorders(client_workorder, 3)
+
+        assert await service.process_outbound() == (3, False)
+
+    async def test_exhausted_budget_defers_remaining_exports(self, service, client_workorder, monkeypatch):
+        """Tests that the cycle stops exporting once its time budget is spent."""
+        service.cycle_time_budget = 1
+        service.outbound_batch_size = 10
+        service.tracos_repo.get_unsynchronized_workorders.return_value = unsynced_workorders(client_workorder, 3)
+        expired = iter([False, True])
+        monkeypatch.setattr("src.main.TimeBudget.expired", lambda self: next(expired, True))
+
+        handled, has_backlog = await service.process_outbound()
+
+        assert (handled, has_backlog) == (1, True)
+        assert service.client_repo.write_outbound_workorder.await_count == 1
+
+    async def test_inbound_files_beyond_the_batch_report_backlog(self, service, client_workorder):
+        """Tests that a bounded inbound cycle asks to run again while files are still pending."""
+        service.inbound_batch_size = 2
+        serve_inbound(service, {f"{i}.json": {**client_workorder, "orderNo": i} for i in range(3)})
+
+        assert await service.process_inbound() == (2, True)
+
+        service.inbound_batch_size = 3
+        assert await service.process_inbound() == (3, False)
+
+    async def test_inbound_reports_written_workorders(self, service, client_workorder):
+        """Tests that inbound counts only writes as work done."""
+        serve_inbound(service, {"7.json": client_workorder})
+
+        assert await service.process_inbound() == (1, False)
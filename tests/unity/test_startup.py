@@ -0,0 +1,56 @@
+import os
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+HEAVY_MODULES = ("motor", "pymongo", "bson", "iso8601")
+
+
+def run_python(code: str, **env) -> str:
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=PROJECT_ROOT,
+        env=dict(os.environ, **env),
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return result.stdout.strip()
+
+
+def test_importing_main_does_not_load_database_drivers():
+    loaded = run_python(
+        "import sys, src.main; "
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    assert loaded == ""
+
+
+def test_serial_inbound_does_not_load_the_process_pool(tmp_path):
+    loaded = run_python(
+        "import asyncio, sys; "
+        "from src.main import IntegrationService; "
+        "from src.client.repository import ClientRepository; "
+        "from src.tracos.memory import InMemoryTracOSRepository; "
+        "from src.utils.checkpoint import SyncCheckpoint; "
+        f"service = IntegrationService(tracos_repo=InMemoryTracOSRepository(), client_repo=ClientRepository({str(tmp_path)!r}, {str(tmp_path)!r}), "
+        f"inbound_workers=1, checkpoint=SyncCheckpoint({str(tmp_path / 'checkpoints')!r})); "
+        "asyncio.run(service.process_inbound()); "
+        "print('concurrent.futures.process' in sys.modules)"
+    )
+    assert loaded == "False"
+
+
+def test_importing_config_does_not_create_directories(tmp_path):
+    inbound_dir, outbound_dir = tmp_path / "inbound", tmp_path / "outbound"
+    run_python("import src.config", DATA_INBOUND_DIR=str(inbound_dir), DATA_OUTBOUND_DIR=str(outbound_dir))
+    assert not inbound_dir.exists()
+    assert not outbound_dir.exists()
+
+
+def test_ensure_data_dirs_creates_directories(tmp_path):
+    from src.config import ensure_data_dirs
+
+    ensure_data_dirs(str(tmp_path / "inbound"), str(tmp_path / "outbound"))
+    assert (tmp_path / "inbound").is_dir()
+    assert (tmp_path / "outbound").is_dir()
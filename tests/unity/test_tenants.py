@@ -0,0 +1,169 @@
+import asyncio
+import json
+import pytest
+from bson import ObjectId
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from src.tenants import MultiTenantService, Tenant, load_tenants
+
+
+def make_tenant(tmp_path, name):
+    return Tenant(name, str(tmp_path / name / "inbound"), str(tmp_path / name / "outbound"), database=f"tracos_{name}")
+
+
+@pytest.fixture
+def write_inbound(client_workorder):
+    def write(tenant, order_no):
+        with open(f"{tenant.inbound_dir}/{order_no}.json", "w") as f:
+            json.dump({**client_workorder, "orderNo": order_no, "summary": f"{tenant.name} workorder"}, f)
+    return write
+
+
+def test_load_tenants_reads_registry(tmp_path):
+    registry = tmp_path / "tenants.json"
+    registry.write_text(json.dumps([
+        {"name": "acme", "inbound_dir": "/data/acme/in", "outbound_dir": "/data/acme/out", "database": "acme"},
+        {"name": "globex", "inbound_dir": "/data/globex/in", "outbound_dir": "/data/globex/out"},
+    ]))
+
+    tenants = load_tenants(str(registry))
+
+    assert [tenant.name for tenant in tenants] == ["acme", "globex"]
+    assert tenants[0].database == "acme"
+    assert tenants[1].collection == "workorders"
+
+
+@pytest.mark.parametrize("entries", [
+    [],
+    [{"name": "acme", "inbound_dir": "/in"}],
+    [{"name": "acme", "inbound_dir": "/a", "outbound_dir": "/b"}, {"name": "acme", "inbound_dir": "/c", "outbound_dir": "/d"}],
+    [{"name": "../acme", "inbound_dir": "/in", "outbound_dir": "/out"}],
+    [{"name": "acme\\globex", "inbound_dir": "/in", "outbound_dir": "/out"}],
+    [{"name": "..", "inbound_dir": "/in", "outbound_dir": "/out"}],
+])
+def test_load_tenants_rejects_invalid_registry(tmp_path, entries):
+    registry = tmp_path / "tenants.json"
+    registry.write_text(json.dumps(entries))
+
+    with pytest.raises(ValueError):
+        load_tenants(str(registry))
+
+
+@pytest.mark.asyncio
+class TestMultiTenantService:
+
+    async def test_run_once_keeps_tenants_and_metrics_separate(self, tmp_path, write_inbound):
+        """Tests that each tenant syncs into its own store and reports its own counters."""
+        acme, globex = make_tenant(tmp_path, "acme"), make_tenant(tmp_path, "globex")
+        service = MultiTenantService([acme, globex], backend="memory", inbound_workers=1, checkpoint_dir="")
+        await service.connect()
+        write_inbound(acme, 1)
+        write_inbound(acme, 2)
+        write_inbound(globex, 1)
+
+        await service.run_once()
+
+        assert len(service.services["acme"].tracos_repo.documents) == 2
+        assert len(service.services["globex"].tracos_repo.documents) == 1
+        metrics = service.metrics_snapshot()
+        assert metrics["acme"]["inbound_saved"] == 2
+        assert metrics["globex"]["inbound_saved"] == 1
+
+    async def test_mongo_tenants_share_one_client(self, tmp_path):
+        """Tests that every tenant store uses the same Motor client and only the service closes it."""
+        with patch("src.tracos.repository.AsyncIOMotorClient") as MockMotorClient:
+            client = MagicMock()
+            client.admin.command = AsyncMock(return_value={"ok": 1})
+            MockMotorClient.return_value = client
+
+            service = MultiTenantService([make_tenant(tmp_path, "acme"), make_tenant(tmp_path, "globex")], backend="mongo", inbound_workers=1, checkpoint_dir="")
+            await service.connect()
+
+            stores = [tenant_service.tracos_repo for tenant_service in service.services.values()]
+            MockMotorClient.assert_called_once()
+            assert all(store.client is client for store in stores)
+            assert [store.db_name for store in stores] == ["tracos_acme", "tracos_globex"]
+
+            await stores[0].disconnect()
+            client.close.assert_not_called()
+            await service.disconnect()
+            client.close.assert_called_once()
+
+    async def test_tenants_sharing_a_database_keep_separate_watermarks(self, tmp_path):
+        """Tests that tenants differing only by collection never read each other's watermark."""
+        acme = Tenant("acme", str(tmp_path / "acme" / "in"), str(tmp_path / "acme" / "out"), database="shared", collection="acme")
+        globex = Tenant("globex", str(tmp_path / "globex" / "in"), str(tmp_path / "globex" / "out"), database="shared", collection="globex")
+        with patch("src.tracos.repository.AsyncIOMotorClient") as MockMotorClient:
+            MockMotorClient.return_value.admin.command = AsyncMock(return_value={"ok": 1})
+            service = MultiTenantService([acme, globex], backend="mongo", inbound_workers=1, checkpoint_dir="")
+            stores = [tenant_service.tracos_repo for tenant_service in service.services.values()]
+            state = {}
+            for store in stores:
+                store.state_collection = MagicMock()
+                store.state_collection.update_one = AsyncMock(side_effect=lambda query, update, upsert: state.__setitem__(query["_id"], update["$set"]))
+                store.state_collection.find_one = AsyncMock(side_effect=lambda query: state.get(query["_id"]))
+
+            await stores[0].save_watermark({"updatedAt": datetime(2025, 5, 30), "_id": ObjectId()})
+
+            assert await stores[0].load_watermark() is not None
+            assert await stores[1].load_watermark() is None
+
+    async def test_busy_tenant_does_not_starve_others(self, tmp_path):
+        """Tests that a tenant with a permanent backlog still leaves turns for the other tenants."""
+        service = MultiTenantService(
+            [make_tenant(tmp_path, "busy"), make_tenant(tmp_path, "quiet")],
+            backend="memory",
+            inbound_workers=1,
+            tenant_concurrency=1,
+            checkpoint_dir="",
+            inbound_interval=0.01,
+            outbound_interval=10,
+            idle_backoff_factor=1,
+        )
+
+        async def busy_cycle():
+            await asyncio.sleep(0.005)
+            return 1, True
+
+        service.services["busy"].process_inbound = AsyncMock(side_effect=busy_cycle)
+        service.services["quiet"].process_inbound = AsyncMock(return_value=(1, False))
+        for tenant_service in service.services.values():
+            tenant_service.process_outbound = AsyncMock(return_value=(0, False))
+
+        shutdown_event = asyncio.Event()
+
+        async def stop_later():
+            await asyncio.sleep(0.2)
+            shutdown_event.set()
+
+        await asyncio.wait_for(asyncio.gather(service.run_continuously(shutdown_event), stop_later()), timeout=2)
+
+        assert service.services["busy"].process_inbound.await_count > 5
+        assert service.services["quiet"].process_inbound.await_count > 2
+
+    async def test_shutdown_while_waiting_for_a_slot_starts_no_new_cycle(self, tmp_path):
+        """Tests that a job waiting for a free slot is not started once shutdown is requested."""
+        service = MultiTenantService(
+            [make_tenant(tmp_path, "acme"), make_tenant(tmp_path, "globex")],
+            backend="memory",
+            inbound_workers=1,
+            tenant_concurrency=1,
+            checkpoint_dir="",
+        )
+        shutdown_event = asyncio.Event()
+
+        async def cycle_then_shutdown():
+            # The dispatcher is waiting for this slot when shutdown is requested
+            await asyncio.sleep(0.01)
+            shutdown_event.set()
+            return 1, False
+
+        for tenant_service in service.services.values():
+            tenant_service.process_inbound = AsyncMock(side_effect=cycle_then_shutdown)
+            tenant_service.process_outbound = AsyncMock(side_effect=cycle_then_shutdown)
+
+        await asyncio.wait_for(service.run_continuously(shutdown_event), timeout=2)
+
+        cycles = sum(s.process_inbound.await_count + s.process_outbound.await_count for s in service.services.values())
+        assert cycles == 1
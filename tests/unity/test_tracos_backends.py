@@ -0,0 +1,132 @@
+import asyncio
+import pytest
+import pytest_asyncio
+from datetime import timedelta
+
+from src.client.repository import ClientRepository
+from src.main import IntegrationService
+from src.tracos.base import SAVE_CREATED, SAVE_STALE, SAVE_UNCHANGED, SAVE_UPDATED
+from src.tracos.latency import LatencyInjectingRepository
+from src.tracos.memory import InMemoryTracOSRepository
+from src.tracos.sqlite import SQLiteTracOSRepository
+
+
+@pytest_asyncio.fixture(params=["memory", "sqlite", "latency"])
+async def store(request, tmp_path):
+    if request.param == "memory":
+        repo = InMemoryTracOSRepository()
+    elif request.param == "sqlite":
+        repo = SQLiteTracOSRepository(str(tmp_path / "tracos.sqlite3"))
+    else:
+        repo = LatencyInjectingRepository(InMemoryTracOSRepository(), latency_seconds=0.001)
+    await repo.connect()
+    yield repo
+    await repo.disconnect()
+
+
+@pytest.mark.asyncio
+class TestTracOSStores:
+
+    async def test_save_outcomes(self, store, tracos_workorder):
+        """Tests create, unchanged, update and stale outcomes."""
+        assert await store.save_workorder(tracos_workorder(1)) == SAVE_CREATED
+        assert await store.save_workorder(tracos_workorder(1)) == SAVE_UNCHANGED
+        assert await store.save_workorder(tracos_workorder(1, "New", hour=11)) == SAVE_UPDATED
+        assert await store.save_workorder(tracos_workorder(1, "Old", hour=9)) == SAVE_STALE
+
+        [stored] = await store.get_unsynchronized_workorders()
+        assert stored["title"] == "New"
+
+    async def test_mark_as_synced_removes_from_queue(self, store, tracos_workorder):
+        """Tests that synced workorders leave the unsynchronized queue."""
+        assert await store.save_workorders([tracos_workorder(1), tracos_workorder(2)]) == [SAVE_CREATED, SAVE_CREATED]
+        unsynced = await store.get_unsynchronized_workorders()
+
+        assert await store.mark_as_synced(str(unsynced[0]["_id"]), client_hash="abc") is True
+        assert await store.mark_many_as_synced([str(unsynced[1]["_id"])]) == 1
+        assert await store.get_unsynchronized_workorders() == []
+
+    async def test_claims_are_exclusive(self, store, tracos_workorder):
+        """Tests that a leased workorder is not claimed twice and only its owner can sync it."""
+        for number in range(3):
+            await store.save_workorder(tracos_workorder(number))
+
+        first = await store.claim_unsynchronized_workorders("a", batch_size=2)
+        second = await store.claim_unsynchronized_workorders("b", batch_size=2)
+
+        assert len(first) == 2 and len(second) == 1
+        assert {wo["number"] for wo in first}.isdisjoint(wo["number"] for wo in second)
+        assert await store.mark_as_synced(str(first[0]["_id"]), owner_id="b") is False
+        assert await store.mark_as_synced(str(first[0]["_id"]), owner_id="a") is True
+
+    async def test_watermark_streaming(self, store, tracos_workorder):
+        """Tests that streaming after a watermark visits every workorder once, in order."""
+        for number in range(5):
+            await store.save_workorder(tracos_workorder(number))
+
+        seen = []
+        async for batch in store.iter_workorders_after(None, batch_size=2):
+            seen.extend(wo["number"] for wo in batch)
+        assert sorted(seen) == list(range(5)) and len(seen) == 5
+
+        latest = await store.get_latest_watermark()
+        await store.save_watermark(latest)
+        assert await store.get_workorders_after(await store.load_watermark()) == []
+        await store.reset_watermark()
+        assert await store.load_watermark() is None
+
+    async def test_watermark_scan_stops_at_until(self, store, tracos_workorder):
+        """Tests that workorders updated at or after until are left for a later scan."""
+        await store.save_workorder(tracos_workorder(1))
+        [stored] = await store.get_workorders_after(None)
+
+        assert await store.get_workorders_after(None, until=stored["updatedAt"]) == []
+        assert len(await store.get_workorders_after(None, until=stored["updatedAt"] + timedelta(seconds=1))) == 1
+
+    async def test_record_client_hashes_leaves_sync_state_alone(self, store, tracos_workorder):
+        """Tests that recording client hashes neither marks workorders synced nor moves updatedAt."""
+        await store.save_workorder(tracos_workorder(1))
+        [before] = await store.get_unsynchronized_workorders()
+
+        assert await store.record_client_hashes({str(before["_id"]): "abc"}) == 1
+
+        [after] = await store.get_unsynchronized_workorders()
+        assert after["clientHash"] == "abc"
+        assert after["updatedAt"] == before["updatedAt"]
+
+
+@pytest.mark.asyncio
+async def test_service_round_trip_on_memory_store(tmp_path, tracos_workorder):
+    """Tests a full inbound/outbound cycle against the in-memory store."""
+    inbound_dir, outbound_dir = tmp_path / "inbound", tmp_path / "outbound"
+    inbound_dir.mkdir()
+    outbound_dir.mkdir()
+    (inbound_dir / "1.json").write_text(
+        '{"orderNo": 1, "summary": "From client", "isCanceled": false, "isDeleted": false,'
+        ' "creationDate": "2025-05-30T10:00:00+00:00", "lastUpdateDate": "2025-05-30T11:00:00+00:00"}'
+    )
+    store = InMemoryTracOSRepository()
+    await store.save_workorder({**tracos_workorder(2, "From TracOS"), "updatedAt": None})
+    service = IntegrationService(tracos_repo=store, client_repo=ClientRepository(str(inbound_dir), str(outbound_dir)), outbound_sync_mode="flag")
+
+    await service.run_once()
+
+    assert sorted(p.name for p in outbound_dir.iterdir()) == ["2.json"]
+    assert service.metrics.get("outbound_echo_suppressed") == 1
+    assert await store.get_unsynchronized_workorders() == []
+
+
+@pytest.mark.asyncio
+async def test_latency_wrapper_delays_bulk_calls_once(tracos_workorder):
+    """Tests that bulk calls reach the inner store as one call and pay the latency once."""
+    inner = InMemoryTracOSRepository()
+    repo = LatencyInjectingRepository(inner, latency_seconds=0)
+    await repo.connect()
+    delays = []
+    repo._delay = lambda: delays.append(1) or asyncio.sleep(0)
+
+    await repo.save_workorders([tracos_workorder(number) for number in range(5)])
+    unsynced = await inner.get_unsynchronized_workorders()
+    assert await repo.mark_many_as_synced([str(wo["_id"]) for wo in unsynced]) == 5
+
+    assert len(delays) == 2
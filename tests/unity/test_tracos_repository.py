@@ -2,8 +2,11 @@ import pytest
 import pytest_asyncio
 from unittest.mock import AsyncMock, MagicMock, patch
 from bson import ObjectId
+from datetime import datetime, timezone
 
-from src.tracos.repository import TracOSRepository
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from src.tracos.repository import SAVE_CREATED, SAVE_STALE, SAVE_UNCHANGED, SAVE_UPDATED, TracOSRepository
 
 # Mock the AsyncIOMotorClient class to prevent real connections
 @pytest_asyncio.fixture
@@ -122,3 +125,287 @@ class TestTracOSRepository:
         assert query_arg["_id"] == ObjectId(workorder_id)
         assert update_arg["isSynced"] is True
         assert "syncedAt" in update_arg
+
+    async def test_claim_unsynchronized_workorders(self, mock_repo):
+        """Tests that a claim leases candidates and returns only the rows it won."""
+        repo, mock_collection = mock_repo
+        candidate_ids = [ObjectId(), ObjectId()]
+
+        candidates_cursor = MagicMock()
+        candidates_cursor.to_list = AsyncMock(return_value=[{"_id": _id} for _id in candidate_ids])
+        claimed_cursor = MagicMock()
+        claimed_cursor.to_list = AsyncMock(return_value=[{"_id": candidate_ids[0], "number": 1}])
+        mock_collection.find.side_effect = [candidates_cursor, claimed_cursor]
+        mock_collection.update_many = AsyncMock(return_value=MagicMock(modified_count=1))
+
+        # Act
+        result = await repo.claim_unsynchronized_workorders("instance-a", batch_size=2, lease_seconds=60)
+
+        # Assert
+        assert result == [{"_id": candidate_ids[0], "number": 1}]
+        claim_filter, claim_update = mock_collection.update_many.call_args[0]
+        assert claim_filter["isSynced"] is False
+        assert claim_filter["_id"] == {"$in": candidate_ids}
+        assert claim_update["$set"]["leaseOwner"] == "instance-a"
+        lease_token = claim_update["$set"]["leaseToken"]
+        assert mock_collection.find.call_args_list[1].args[0] == {"leaseToken": lease_token}
+
+    async def test_claim_returns_empty_without_candidates(self, mock_repo):
+        """Tests that no claim is attempted when nothing is claimable."""
+        repo, mock_collection = mock_repo
+        mock_collection.find.return_value.to_list = AsyncMock(return_value=[])
+        mock_collection.update_many = AsyncMock()
+
+        result = await repo.claim_unsynchronized_workorders("instance-a")
+
+        assert result == []
+        mock_collection.update_many.assert_not_awaited()
+
+    async def test_mark_as_synced_with_lease_owner(self, mock_repo):
+        """Tests that only the lease holder can mark a claimed workorder as synced."""
+        repo, mock_collection = mock_repo
+        workorder_id = "60c72b2f9b1e8b3b4c8b4567"
+        mock_collection.update_one.return_value = MagicMock(modified_count=0)
+
+        result = await repo.mark_as_synced(workorder_id, owner_id="instance-a")
+
+        assert result is False
+        query_arg, update_arg = mock_collection.update_one.call_args[0]
+        assert query_arg == {"_id": ObjectId(workorder_id), "leaseOwner": "instance-a"}
+        assert "leaseOwner" in update_arg["$unset"]
+
+    async def test_get_workorders_after_watermark(self, mock_repo):
+        """Tests that the incremental scan resumes strictly after (updatedAt, _id)."""
+        repo, mock_collection = mock_repo
+        mock_collection.find.return_value.to_list = AsyncMock(return_value=[{"number": 2}])
+        watermark = {"updatedAt": datetime(2025, 5, 30, tzinfo=timezone.utc), "_id": ObjectId()}
+
+        result = await repo.get_workorders_after(watermark, limit=10)
+
+        assert result == [{"number": 2}]
+        query = mock_collection.find.call_args.args[0]
+        assert query["$or"][0] == {"updatedAt": {"$gt": watermark["updatedAt"]}}
+        assert query["$or"][1] == {"updatedAt": watermark["updatedAt"], "_id": {"$gt": watermark["_id"]}}
+        assert mock_collection.find.call_args.kwargs["sort"] == [("updatedAt", 1), ("_id", 1)]
+
+    async def test_get_workorders_after_until_bounds_updated_at(self, mock_repo):
+        """Tests that the scan leaves out workorders updated at or after until."""
+        repo, mock_collection = mock_repo
+        mock_collection.find.return_value.to_list = AsyncMock(return_value=[])
+        until = datetime(2025, 5, 30, tzinfo=timezone.utc)
+
+        await repo.get_workorders_after(None, until=until)
+
+        assert mock_collection.find.call_args.args[0] == {"updatedAt": {"$lt": until}}
+
+    async def test_get_workorders_after_without_watermark_scans_everything(self, mock_repo):
+        """Tests that a missing watermark starts a full backfill."""
+        repo, mock_collection = mock_repo
+        mock_collection.find.return_value.to_list = AsyncMock(return_value=[])
+
+        await repo.get_workorders_after(None)
+
+        assert mock_collection.find.call_args.args[0] == {}
+
+    async def test_save_and_load_watermark(self, mock_repo):
+        """Tests that watermarks round-trip through the state collection."""
+        repo, _ = mock_repo
+        repo.state_collection = MagicMock()
+        repo.state_collection.update_one = AsyncMock()
+        watermark = {"updatedAt": datetime(2025, 5, 30, tzinfo=timezone.utc), "_id": ObjectId()}
+
+        assert await repo.save_watermark(watermark) is True
+        saved = repo.state_collection.update_one.call_args.args[1]["$set"]
+        repo.state_collection.find_one = AsyncMock(return_value={"_id": "watermark:workorders:outbound", **saved})
+
+        assert await repo.load_watermark() == watermark
+
+    async def test_update_sets_only_changed_fields(self, mock_repo):
+        """Tests that an update $sets the delta and never rewrites createdAt."""
+        repo, mock_collection = mock_repo
+        stored_created = datetime(2025, 5, 1, 10, 0, 0, 123000)
+        existing_wo = {"number": 123, "title": "Old Title", "status": "pending", "description": "", "createdAt": stored_created}
+        new_wo_data = {
+            "number": 123, "title": "New Title", "status": "pending", "description": "",
+            "createdAt": datetime(2025, 5, 1, 10, 0, 0, 123456, tzinfo=timezone.utc),
+            "updatedAt": datetime(2025, 5, 2, tzinfo=timezone.utc),
+        }
+        mock_collection.find_one.return_value = existing_wo
+        mock_collection.update_one.return_value = MagicMock(modified_count=1)
+
+        result = await repo.create_or_update_workorder(new_wo_data)
+
+        assert result is True
+        update_doc = mock_collection.update_one.call_args[0][1]["$set"]
+        assert set(update_doc) == {"title", "updatedAt", "isSynced", "sourceUpdatedAt"}
+        assert update_doc["updatedAt"] != new_wo_data["updatedAt"]
+        assert update_doc["sourceUpdatedAt"] == new_wo_data["updatedAt"]
+
+    async def test_marker_only_change_does_not_requeue_export(self, mock_repo):
+        """Tests that recording sync markers leaves updatedAt and isSynced alone."""
+        repo, mock_collection = mock_repo
+        existing_wo = {"number": 123, "title": "Same Title", "isSynced": False}
+        new_wo_data = {"number": 123, "title": "Same Title", "syncOrigin": "client", "clientHash": "abc"}
+        mock_collection.find_one.return_value = existing_wo
+        mock_collection.update_one.return_value = MagicMock(modified_count=1)
+
+        await repo.create_or_update_workorder(new_wo_data)
+
+        update_arg = mock_collection.update_one.call_args[0][1]
+        assert update_arg == {"$set": {"syncOrigin": "client", "clientHash": "abc"}}
+
+    async def test_compute_delta_ignores_stored_datetime_precision(self, mock_repo):
+        """Tests that datetimes read back from MongoDB compare equal to the parsed originals."""
+        repo, _ = mock_repo
+        parsed = datetime(2025, 5, 1, 10, 0, 0, 123456, tzinfo=timezone.utc)
+        stored = datetime(2025, 5, 1, 10, 0, 0, 123000)
+
+        assert repo.compute_delta({"deletedAt": stored}, {"deletedAt": parsed}) == {}
+
+    async def test_save_rejects_stale_version_after_read(self, mock_repo):
+        """Tests that an older client version never overwrites a newer stored one."""
+        repo, mock_collection = mock_repo
+        mock_collection.find_one.return_value = {"number": 123, "title": "Newer", "sourceUpdatedAt": datetime(2025, 5, 2)}
+        older = {"number": 123, "title": "Older", "updatedAt": datetime(2025, 5, 1, tzinfo=timezone.utc)}
+
+        assert await repo.save_workorder(older) == SAVE_STALE
+        mock_collection.update_one.assert_not_awaited()
+
+    async def test_conditional_upsert_is_a_single_guarded_write(self, mock_repo):
+        """Tests that conditional mode upserts without reading and guards on sourceUpdatedAt."""
+        repo, mock_collection = mock_repo
+        repo.write_mode = "conditional"
+        incoming_ts = datetime(2025, 5, 2, tzinfo=timezone.utc)
+        mock_collection.update_one.return_value = MagicMock(upserted_id=None)
+
+        outcome = await repo.save_workorder({"number": 123, "title": "New", "createdAt": incoming_ts, "updatedAt": incoming_ts})
+
+        assert outcome == SAVE_UPDATED
+        mock_collection.find_one.assert_not_awaited()
+        query, update = mock_collection.update_one.call_args.args
+        assert query["number"] == 123
+        assert {"sourceUpdatedAt": {"$lt": incoming_ts}} in query["$or"]
+        assert update["$set"]["sourceUpdatedAt"] == incoming_ts
+        assert "createdAt" not in update["$set"]
+        assert mock_collection.update_one.call_args.kwargs["upsert"] is True
+
+    async def test_conditional_upsert_creates_missing_workorder(self, mock_repo):
+        """Tests that conditional mode reports inserts."""
+        repo, mock_collection = mock_repo
+        repo.write_mode = "conditional"
+        mock_collection.update_one.return_value = MagicMock(upserted_id=ObjectId())
+
+        assert await repo.save_workorder({"number": 1, "updatedAt": datetime(2025, 5, 2)}) == SAVE_CREATED
+
+    async def test_conditional_upsert_counts_duplicate_key_as_stale(self, mock_repo):
+        """Tests that a write rejected because a newer version is stored is not reported as a failure."""
+        repo, mock_collection = mock_repo
+        repo.write_mode = "conditional"
+        mock_collection.update_one.side_effect = DuplicateKeyError("E11000 duplicate key")
+        mock_collection.find_one.return_value = {"number": 1, "sourceUpdatedAt": datetime(2025, 5, 3)}
+
+        assert await repo.save_workorder({"number": 1, "updatedAt": datetime(2025, 5, 2)}) == SAVE_STALE
+        assert await repo.create_or_update_workorder({"number": 1, "updatedAt": datetime(2025, 5, 2)}) is True
+
+    @pytest.mark.parametrize("write_mode", ["delta", "conditional"])
+    async def test_equal_source_timestamp_means_the_same_in_both_modes(self, mock_repo, write_mode):
+        """Tests that an equal lastUpdateDate is unchanged for the same content and an update otherwise."""
+        repo, mock_collection = mock_repo
+        repo.write_mode = write_mode
+        ts = datetime(2025, 5, 2)
+        # The conditional upsert does not match an equal timestamp and runs into the unique index
+        rejected = [DuplicateKeyError("E11000 duplicate key")] if write_mode == "conditional" else []
+        mock_collection.find_one.return_value = {"number": 1, "title": "Same", "updatedAt": ts, "sourceUpdatedAt": ts}
+
+        mock_collection.update_one.side_effect = rejected + [MagicMock(modified_count=1)]
+        assert await repo.save_workorder({"number": 1, "title": "Same", "updatedAt": ts}) == SAVE_UNCHANGED
+        mock_collection.update_one.side_effect = rejected + [MagicMock(modified_count=1)]
+        assert await repo.save_workorder({"number": 1, "title": "Changed", "updatedAt": ts}) == SAVE_UPDATED
+
+    async def test_conditional_mode_requires_the_unique_index(self, mock_repo):
+        """Tests that connecting in conditional mode fails when the unique index cannot be created."""
+        repo, mock_collection = mock_repo
+        repo.client.admin.command = AsyncMock(return_value={"ok": 1})
+        mock_collection.create_index = AsyncMock(side_effect=Exception("duplicate key value for number"))
+
+        repo.write_mode = "delta"
+        await repo.ensure_indexes()
+
+        repo.write_mode = "conditional"
+        with patch("src.tracos.repository.AsyncIOMotorClient", return_value=repo.client):
+            with pytest.raises(RuntimeError):
+                await repo.connect()
+
+    async def test_save_workorders_uses_one_read_and_one_bulk_write(self, mock_repo):
+        """Tests that a batch is persisted with a single find and a single bulk_write."""
+        repo, mock_collection = mock_repo
+        ts = datetime(2025, 5, 2, tzinfo=timezone.utc)
+        stored = [
+            {"number": 2, "title": "Old title", "sourceUpdatedAt": datetime(2025, 5, 1)},
+            {"number": 3, "title": "Same", "sourceUpdatedAt": datetime(2025, 5, 2)},
+            {"number": 4, "title": "Newer", "sourceUpdatedAt": datetime(2025, 5, 3)},
+        ]
+        mock_collection.find.return_value.to_list = AsyncMock(return_value=stored)
+        mock_collection.bulk_write = AsyncMock(return_value=MagicMock(matched_count=1))
+        batch = [
+            {"number": 1, "title": "New", "updatedAt": ts},
+            {"number": 2, "title": "New title", "updatedAt": ts},
+            {"number": 3, "title": "Same", "updatedAt": ts},
+            {"number": 4, "title": "Older", "updatedAt": ts},
+        ]
+
+        outcomes = await repo.save_workorders(batch)
+
+        assert outcomes == [SAVE_CREATED, SAVE_UPDATED, SAVE_UNCHANGED, SAVE_STALE]
+        mock_collection.find.assert_called_once()
+        operations = mock_collection.bulk_write.call_args.args[0]
+        assert len(operations) == 2
+        assert mock_collection.bulk_write.call_args.kwargs["ordered"] is False
+        mock_collection.find_one.assert_not_awaited()
+
+    async def test_save_workorders_retries_writes_rejected_in_bulk(self, mock_repo):
+        """Tests that a write rejected inside the bulk (e.g. a concurrent insert) is retried on its own."""
+        repo, mock_collection = mock_repo
+        ts = datetime(2025, 5, 2, tzinfo=timezone.utc)
+        mock_collection.find.return_value.to_list = AsyncMock(return_value=[])
+        mock_collection.bulk_write = AsyncMock(side_effect=BulkWriteError({
+            "writeErrors": [{"index": 1, "code": 11000, "errmsg": "E11000 duplicate key"}],
+            "nMatched": 0,
+        }))
+        mock_collection.find_one.return_value = {"number": 2, "title": "Concurrent", "sourceUpdatedAt": datetime(2025, 5, 3)}
+
+        outcomes = await repo.save_workorders([
+            {"number": 1, "title": "A", "updatedAt": ts},
+            {"number": 2, "title": "B", "updatedAt": ts},
+        ])
+
+        assert outcomes == [SAVE_CREATED, SAVE_STALE]
+        mock_collection.find_one.assert_awaited_once()
+
+    async def test_save_workorders_in_conditional_mode_does_not_read(self, mock_repo):
+        """Tests that a conditional batch is one bulk of guarded upserts, with duplicate keys settled by the delta path."""
+        repo, mock_collection = mock_repo
+        repo.write_mode = "conditional"
+        ts = datetime(2025, 5, 2, tzinfo=timezone.utc)
+        mock_collection.bulk_write = AsyncMock(side_effect=BulkWriteError({
+            "writeErrors": [{"index": 2, "code": 11000, "errmsg": "E11000 duplicate key"}],
+            "upserted": [{"index": 0, "_id": ObjectId()}],
+            "nMatched": 1,
+        }))
+        mock_collection.find_one.return_value = {"number": 3, "title": "Newer", "sourceUpdatedAt": datetime(2025, 5, 3)}
+
+        outcomes = await repo.save_workorders([
+            {"number": 1, "title": "New", "updatedAt": ts},
+            {"number": 2, "title": "Changed", "updatedAt": ts},
+            {"number": 3, "title": "Older", "updatedAt": ts},
+        ])
+
+        assert outcomes == [SAVE_CREATED, SAVE_UPDATED, SAVE_STALE]
+        mock_collection.find.assert_not_called()
+        operations = mock_collection.bulk_write.call_args.args[0]
+        assert len(operations) == 3
+        assert all(operation._upsert for operation in operations)
+        assert {"sourceUpdatedAt": {"$lt": ts}} in operations[0]._filter["$or"]
+        # Only the duplicate key is read, to settle it
+        mock_collection.find_one.assert_awaited_once()
+        mock_collection.update_one.assert_not_awaited()